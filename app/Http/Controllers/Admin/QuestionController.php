@@ -5,6 +5,7 @@
 use App\Http\Controllers\Controller;
 use App\Models\Question;
 use Illuminate\Http\Request;
+use Illuminate\Support\Facades\Http;
 use Illuminate\Support\Facades\Log; // <-- Tambahkan fasad Log
 use Illuminate\Support\Facades\Storage;
 use Illuminate\Support\Facades\Validator;
@@ -85,6 +86,9 @@ public function destroy(string $id)
         }
 
         $question->delete();
+        Http::async()->post(env('AI_SERVICE_URL', 'http://localhost:5000/ai') . "/remove_question", [
+            'question_id' => $question->id
+        ]);
         Log::info('Pertanyaan ID: ' . $id . ' berhasil di-soft-delete oleh Admin (ID: ' .  Auth::id() . ')');
 
         return response()->json(['message' => 'Pertanyaan berhasil dipindahkan ke arsip.']);
@@ -102,6 +106,9 @@ public function restore(string $id)
         }
 
         $question->restore();
+        Http::async()->post(env('AI_SERVICE_URL', 'http://localhost:5000/ai') . "/process_embeddings", [
+            'question_id' => $question->id
+        ]);
         Log::info('Pertanyaan ID: ' . $id . ' berhasil dipulihkan oleh Admin (ID: ' .  Auth::id() . ')');
 
         return response()->json(['message' => 'Pertanyaan berhasil dipulihkan.']);
@@ -124,6 +131,9 @@ public function forceDelete(string $id)
         }
 
         $question->forceDelete();
+        Http::async()->post(env('AI_SERVICE_URL', 'http://localhost:5000/ai') . "/remove_question", [
+            'question_id' => $id
+        ]);
         Log::warning('PERMANENT DELETE: Pertanyaan ID: ' . $id . ' telah dihapus permanen oleh Admin (ID: ' .  Auth::id() . ')');
 
         return response()->json(['message' => 'Pertanyaan berhasil dihapus secara permanen.']);
@@ -0,0 +1,31 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration
+{
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::create('tag_feedback_events', function (Blueprint $table) {
+            $table->id();
+            $table->binary('text_embedding');
+            $table->binary('image_embedding')->nullable();
+            $table->json('selected_tags');
+            $table->json('punished_tags');
+            $table->timestamp('created_at')->useCurrent();
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::dropIfExists('tag_feedback_events');
+    }
+};
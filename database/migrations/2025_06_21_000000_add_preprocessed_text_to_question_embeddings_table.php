@@ -0,0 +1,29 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration {
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('question_embeddings', function (Blueprint $table) {
+            $table->text('clean_title')->nullable()->after('image_embedding');
+            $table->longText('clean_question')->nullable()->after('clean_title');
+            $table->unsignedSmallInteger('preprocess_version')->nullable()->after('clean_question');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('question_embeddings', function (Blueprint $table) {
+            $table->dropColumn(['clean_title', 'clean_question', 'preprocess_version']);
+        });
+    }
+};
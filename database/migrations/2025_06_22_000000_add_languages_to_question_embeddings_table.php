@@ -0,0 +1,28 @@
+<?php
+
+use Illuminate\Database\Migrations\Migration;
+use Illuminate\Database\Schema\Blueprint;
+use Illuminate\Support\Facades\Schema;
+
+return new class extends Migration {
+    /**
+     * Run the migrations.
+     */
+    public function up(): void
+    {
+        Schema::table('question_embeddings', function (Blueprint $table) {
+            $table->string('title_language', 16)->nullable()->after('preprocess_version');
+            $table->string('question_language', 16)->nullable()->after('title_language');
+        });
+    }
+
+    /**
+     * Reverse the migrations.
+     */
+    public function down(): void
+    {
+        Schema::table('question_embeddings', function (Blueprint $table) {
+            $table->dropColumn(['title_language', 'question_language']);
+        });
+    }
+};
@@ -1,13 +1,13 @@
 from flask import Flask, Blueprint, request, jsonify
-from sentence_transformers import SentenceTransformer
-from torchvision import models, transforms
-from torchvision.models import ResNet50_Weights
-from PIL import Image
-import torch
 import base64
+import hmac
 import numpy as np
-import pandas as pd
 import threading, time
+import subprocess
+import sys
+import json
+import queue
+from collections import OrderedDict
 import os
 from mysql.connector import pooling, Error
 import time
@@ -15,20 +15,31 @@ from datetime import timedelta
 import heapq
 from dotenv import load_dotenv
 from flask_cors import CORS
-from functools import lru_cache
-from deepface import DeepFace
 import cv2
-import joblib
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
-from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-import spacy
 import io
+import logging
 from apscheduler.schedulers.background import BackgroundScheduler
-from retrain_model import safe_model_retrain
-from shared_features import create_features_from_embeddings, multilingual_preprocess
+from shared_features import (
+    PreparedQuestions, align_feature_matrix, build_feature_matrix, load_nlp_models, preprocess_for_storage,
+    preprocess_questions, stored_languages, stored_preprocessed
+)
+import embeddings
+from embeddings import (
+    QUESTION_EMBEDDING_UPSERT, compute_image_embedding, compute_image_embeddings, compute_text_embedding,
+    compute_text_embeddings, encode_image_embedding, encode_text_embedding, image_model_resource, question_image_path,
+    text_model_resource
+)
+from embedding_codec import decode_embedding
+from lazy_resource import LazyResource, not_ready, readiness_report
+from candidate_store import CandidateStore
+from duplicate_model import artifact_signature, load_duplicate_model
+from vector_index import VectorIndex
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 load_dotenv()
+process_started_at = time.time()
 
 #SD (Data Structures)
 class UserViewStat:
@@ -172,6 +183,17 @@ def fetch_from_db(query, params=None):
         if conn and conn.is_connected():
             conn.close()
 
+# Rows are stamped when they are written but may commit later (Laravel saves inside transactions), so
+# incremental refreshes read up to WATERMARK_LAG_SECONDS before now and pick up the rest next time.
+WATERMARK_LAG_SECONDS = int(os.getenv('WATERMARK_LAG_SECONDS', 30))
+
+def db_watermark(cur=None):
+    query, params = "SELECT NOW() - INTERVAL %s SECOND AS watermark", (WATERMARK_LAG_SECONDS,)
+    if cur is None:
+        return fetch_from_db(query, params)[0]['watermark']
+    cur.execute(query, params)
+    return cur.fetchall()[0]['watermark']
+
 def build_user_views_from_db():
     query = """
         SELECT v.user_id AS viewer_user_id,
@@ -188,7 +210,7 @@ def build_user_views_from_db():
         rows = fetch_from_db(query, (last_synced_at,))
     except Exception as e:
         print(f"Error while fetching data from the database: {e}")
-        return
+        return False
 
     for row in rows:
         user_view_stat.add_view(row['viewer_user_id'], row['owner_user_id'], row['new_total_views'])
@@ -220,7 +242,7 @@ def build_graph_from_db():
         rows = fetch_from_db(query, params)
     except Exception as e:
         print(f"Error fetching follows from DB: {e}")
-        return
+        return False
 
     for row in rows:
         follower_id = row['follower_id']
@@ -277,7 +299,7 @@ def build_leaderboard_from_db():
         rows = fetch_from_db(query, params)
     except Exception as e:
         print(f"Error fetching leaderboard data from DB: {e}")
-        return
+        return False
 
     with db_lock_leaderboard:
         processed_tags = set()
@@ -301,6 +323,45 @@ def monitor_leaderboard_db(interval=2):
             print(f"Error monitoring leaderboard database: {e}")
 
 
+def initial_load(build, description):
+    """Wraps a build_*_from_db poller so its first run can back a LazyResource."""
+    def load():
+        if build() is False:
+            raise RuntimeError(f"Initial {description} load failed.")
+        return True
+    return load
+
+def start_poller(resource, monitor, interval):
+    """Retries the resource's first load until it succeeds, then hands over to the monitor loop."""
+    def run():
+        while not resource.is_ready():
+            resource.warm_up()
+            if not resource.is_ready():
+                time.sleep(5)
+        monitor(interval)
+    threading.Thread(target=run, name=f"poller-{resource.name}", daemon=True).start()
+
+user_views_resource = LazyResource('user_views', initial_load(build_user_views_from_db, 'user views'))
+follow_graph_resource = LazyResource('follow_graph', initial_load(build_graph_from_db, 'follow graph'))
+leaderboard_resource = LazyResource('leaderboard', initial_load(build_leaderboard_from_db, 'leaderboard'))
+
+def not_ready_response(*resources):
+    missing = not_ready(*resources)
+    if not missing:
+        return None
+    response = jsonify(success=False, message="Service is warming up, retry shortly.", not_ready=missing)
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+@app.route('/health', methods=['GET'])
+def health():
+    return jsonify(status="ok", uptime_seconds=round(time.time() - process_started_at, 3)), 200
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    is_ready, components = readiness_report()
+    return jsonify(ready=is_ready, components=components), 200 if is_ready else 503
+
 @app.route('/top-viewed', methods=['GET'])
 def top_viewed_api():
     try:
@@ -447,37 +508,239 @@ def leaderboard_api():
 
 
 #AIML (Artificial Intelligence and Machine Learning)
-# --- Universal Text/Image Models ---
-text_model = SentenceTransformer('paraphrase-multilingual-MiniLM-L12-v2')
-resnet = models.resnet50(weights=ResNet50_Weights.DEFAULT)
-image_model = torch.nn.Sequential(*list(resnet.children())[:-1]).eval()
-preprocess = transforms.Compose([
-    transforms.Resize((224,224)),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485,0.456,0.406], std=[0.229,0.224,0.225])
-])
-
-try:
-    stemmer_id = StemmerFactory().create_stemmer()
-    stopword_remover_id = StopWordRemoverFactory().create_stop_word_remover()
-    nlp_en = spacy.load("en_core_web_sm")
-    print("Successfully loaded Sastrawi and spaCy models.")
-except Exception as e:
-    print(f"ERROR loading NLP helper models: {e}")
-    stemmer_id, stopword_remover_id, nlp_en = None, None, None
-
-MODEL_PATH = 'duplicate_classifier_model.pkl'
-duplicate_classifier_model = None
-model_last_reloaded = 0
+# --- NLP Helper Models (text/image embedding models live in embeddings.py) ---
+nlp_models_resource = LazyResource('nlp_models', load_nlp_models)
+
 model_lock = threading.Lock()
 
 #tag-recommender
 tag_bp = Blueprint('tag_recommender', __name__, url_prefix='/ai')
 CORS(app, resources={r"/ai/*": {"origins": "http://localhost:8000"}})
 
-tag_prototypes = {}
+class TagPrototypeMatrix:
+    def __init__(self, tag_ids, text_matrix, image_matrix, has_image, counts):
+        self.tag_ids = list(tag_ids)
+        self.tag_index = {tid: i for i, tid in enumerate(self.tag_ids)}
+        self.text_matrix = text_matrix
+        self.image_matrix = image_matrix
+        self.has_image = has_image
+        self.counts = counts
+        # Prototypes as built from the data; text_matrix/image_matrix are these plus learned feedback.
+        self.base_text_matrix = text_matrix.copy()
+        self.base_image_matrix = image_matrix.copy() if image_matrix is not None else None
+
+    def rows_for(self, tag_ids):
+        """Returns (tag ids present in the matrix, their row indices)."""
+        present = [tid for tid in tag_ids if tid in self.tag_index]
+        return present, np.array([self.tag_index[tid] for tid in present], dtype=np.int64)
+
+    def __len__(self):
+        return len(self.tag_ids)
+
+    @classmethod
+    def empty(cls):
+        return cls([], np.zeros((0, 0), dtype=np.float32), None, np.zeros(0, dtype=bool), np.zeros(0, dtype=np.int64))
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+class TagFeedbackStore:
+    """
+    Online learning signal from /ai/tag_feedback, kept apart from the data-built prototypes.
+
+    Each tag has a text (and image) offset: an exponential moving average of the unit embeddings of the
+    questions it was selected for (+1) or wrongly recommended for (-1). A prototype row is always
+    normalize(base row + offset_weight * offset), so offsets survive every prototype rebuild.
+
+    This differs from the old rule, which moved the prototype itself towards (or away from) each
+    embedding and could eventually replace it entirely (until the next rebuild discarded it). Here
+    |offset| <= 1, so feedback can move a prototype by at most offset_weight relative to the data-built
+    base; TAG_FEEDBACK_OFFSET_WEIGHT above 1 lets feedback outweigh the base.
+
+    Events are buffered and written to tag_feedback_events in batches; the most recent
+    TAG_FEEDBACK_REPLAY_LIMIT are replayed in order at startup (older ones have all but decayed out of
+    the moving averages). Live events arriving during the replay are held back and applied after it.
+    """
+
+    def __init__(self, learning_rate, offset_weight=1.0):
+        self.learning_rate = learning_rate
+        self.offset_weight = offset_weight
+        self.replaying = True
+        self.held = []
+        self.offset_index = {}
+        self.text_offsets = None
+        self.image_offsets = None
+        self.image_offset_set = np.zeros(0, dtype=bool)
+        self.pending = []
+        self.pending_lock = threading.Lock()
+
+    def _offset_rows(self, tag_ids, text_dim, image_dim):
+        for tid in tag_ids:
+            if tid not in self.offset_index:
+                self.offset_index[tid] = len(self.offset_index)
+        size = len(self.offset_index)
+        if self.text_offsets is None:
+            self.text_offsets = np.zeros((max(size, 64), text_dim), dtype=np.float32)
+        elif size > self.text_offsets.shape[0]:
+            capacity = max(size, 2 * self.text_offsets.shape[0])
+            extra = capacity - self.text_offsets.shape[0]
+            self.text_offsets = np.vstack([self.text_offsets, np.zeros((extra, text_dim), dtype=np.float32)])
+        if image_dim is not None:
+            if self.image_offsets is None:
+                self.image_offsets = np.zeros((self.text_offsets.shape[0], image_dim), dtype=np.float32)
+            elif self.image_offsets.shape[0] < self.text_offsets.shape[0]:
+                extra = self.text_offsets.shape[0] - self.image_offsets.shape[0]
+                self.image_offsets = np.vstack([self.image_offsets, np.zeros((extra, image_dim), dtype=np.float32)])
+        if self.image_offset_set.shape[0] < self.text_offsets.shape[0]:
+            self.image_offset_set = np.concatenate([
+                self.image_offset_set, np.zeros(self.text_offsets.shape[0] - self.image_offset_set.shape[0], dtype=bool)
+            ])
+        return np.array([self.offset_index[tid] for tid in tag_ids], dtype=np.int64)
+
+    def record(self, text_emb, img_emb, selected_tags, punished_tags, persist=True):
+        """Folds one feedback event into the offsets (call with model_lock held); returns the touched tag ids."""
+        selected_tags, punished_tags = sorted(selected_tags), sorted(punished_tags)
+        tag_ids = selected_tags + punished_tags
+        if not tag_ids or text_emb is None:
+            return []
+        if persist:
+            with self.pending_lock:
+                self.pending.append((
+                    encode_text_embedding(text_emb), encode_image_embedding(img_emb),
+                    json.dumps(selected_tags), json.dumps(punished_tags)
+                ))
+                if len(self.pending) > TAG_FEEDBACK_MAX_PENDING:
+                    dropped = len(self.pending) - TAG_FEEDBACK_MAX_PENDING
+                    del self.pending[:dropped]
+                    print(f"WARNING: Tag feedback buffer full, dropped {dropped} unsaved event(s).")
+                if self.replaying:
+                    # Applied once the replay has folded in every older event, so the averages stay in order.
+                    self.held.append((text_emb, img_emb, selected_tags, punished_tags))
+                    del self.held[:-TAG_FEEDBACK_MAX_PENDING]
+                    return []
+        text_unit = normalize_rows(text_emb)
+        img_unit = normalize_rows(img_emb) if img_emb is not None else None
+        rows = self._offset_rows(tag_ids, text_unit.shape[0], img_unit.shape[0] if img_unit is not None else None)
+        signs = np.array([1.0] * len(selected_tags) + [-1.0] * len(punished_tags), dtype=np.float32)[:, None]
+
+        lr = self.learning_rate
+        self.text_offsets[rows] = (1.0 - lr) * self.text_offsets[rows] + lr * signs * text_unit
+        if img_unit is not None and self.image_offsets is not None and self.image_offsets.shape[1] == img_unit.shape[0]:
+            self.image_offsets[rows] = (1.0 - lr) * self.image_offsets[rows] + lr * signs * img_unit
+            self.image_offset_set[rows] = True
+        return tag_ids
+
+    def apply_to(self, prototypes, tag_ids=None):
+        """Recomputes prototype rows as normalize(base + offset) for tags with feedback (call with model_lock held)."""
+        if self.text_offsets is None or not len(prototypes):
+            return
+        tag_ids, proto_rows = prototypes.rows_for(self.offset_index if tag_ids is None else tag_ids)
+        if not tag_ids:
+            return
+        offset_rows = np.array([self.offset_index[tid] for tid in tag_ids], dtype=np.int64)
+        prototypes.text_matrix[proto_rows] = normalize_rows(
+            prototypes.base_text_matrix[proto_rows] + self.offset_weight * self.text_offsets[offset_rows]
+        )
+        if prototypes.image_matrix is not None and self.image_offsets is not None \
+                and self.image_offsets.shape[1] == prototypes.image_matrix.shape[1]:
+            # Like before, feedback only moves image prototypes of tags that have one.
+            keep = prototypes.has_image[proto_rows] & self.image_offset_set[offset_rows]
+            proto_rows, offset_rows = proto_rows[keep], offset_rows[keep]
+            prototypes.image_matrix[proto_rows] = normalize_rows(
+                prototypes.base_image_matrix[proto_rows] + self.offset_weight * self.image_offsets[offset_rows]
+            )
+
+    def flush(self):
+        # Nothing is written until the replay has read the stored events, or held events would be replayed twice.
+        if self.replaying:
+            return 0
+        with self.pending_lock:
+            batch, self.pending = self.pending, []
+        if not batch:
+            return 0
+        conn = None
+        try:
+            conn = conn_pool.get_connection()
+            cur = conn.cursor()
+            cur.executemany(
+                """
+                INSERT INTO tag_feedback_events (text_embedding, image_embedding, selected_tags, punished_tags, created_at)
+                VALUES (%s, %s, %s, %s, NOW())
+                """, batch
+            )
+            conn.commit()
+            cur.close()
+            return len(batch)
+        except Exception as e:
+            print(f"Error flushing {len(batch)} tag feedback event(s), will retry: {e}")
+            with self.pending_lock:
+                self.pending[:0] = batch
+            return 0
+        finally:
+            if conn and conn.is_connected():
+                conn.close()
+
+    def replay_from_db(self):
+        """Rebuilds the offsets from the most recent stored events, in insertion order."""
+        with model_lock:
+            # A retry after a failed replay starts over rather than folding the same events in twice.
+            self.offset_index = {}
+            self.text_offsets = self.image_offsets = None
+            self.image_offset_set = np.zeros(0, dtype=bool)
+        conn = conn_pool.get_connection()
+        replayed = 0
+        try:
+            cur = conn.cursor(dictionary=True)
+            cur.execute(
+                """
+                SELECT text_embedding, image_embedding, selected_tags, punished_tags FROM (
+                    SELECT id, text_embedding, image_embedding, selected_tags, punished_tags
+                    FROM tag_feedback_events ORDER BY id DESC LIMIT %s
+                ) recent ORDER BY id
+                """, (TAG_FEEDBACK_REPLAY_LIMIT,)
+            )
+            while True:
+                rows = cur.fetchmany(TAG_MODEL_FETCH_SIZE)
+                if not rows:
+                    break
+                with model_lock:
+                    for row in rows:
+                        self.record(
+                            decode_embedding(row['text_embedding']), decode_embedding(row['image_embedding']),
+                            json.loads(row['selected_tags']), json.loads(row['punished_tags']), persist=False
+                        )
+                        replayed += 1
+            cur.close()
+        finally:
+            conn.close()
+        with model_lock:
+            with self.pending_lock:
+                held, self.held = self.held, []
+                self.replaying = False
+            for event in held:
+                self.record(*event, persist=False)
+        return replayed
+
+tag_prototypes = TagPrototypeMatrix.empty()
+# Running per-tag sums maintained by update_tag_model; only touched by the tag model monitor thread.
+tag_aggregates = {}
+tag_seed_embeddings = {}
+tag_model_watermark = None
+tag_model_last_full_rebuild = 0
+# Set when questions are hard-deleted: their rows are gone, so only a full scan drops them.
+tag_model_rebuild_requested = threading.Event()
+TAG_MODEL_FETCH_SIZE = 500
+TAG_MODEL_FULL_REBUILD_INTERVAL = int(os.getenv('TAG_MODEL_FULL_REBUILD_INTERVAL', 24 * 60 * 60))
 epsilon = 0.1
-learning_rate = 0.01
+exploration_rng = np.random.default_rng()
+learning_rate = float(os.getenv('TAG_FEEDBACK_LEARNING_RATE', 0.01))
+TAG_FEEDBACK_OFFSET_WEIGHT = float(os.getenv('TAG_FEEDBACK_OFFSET_WEIGHT', 1.0))
+TAG_FEEDBACK_FLUSH_INTERVAL = float(os.getenv('TAG_FEEDBACK_FLUSH_INTERVAL', 5))
+TAG_FEEDBACK_MAX_PENDING = int(os.getenv('TAG_FEEDBACK_MAX_PENDING', 10000))
+TAG_FEEDBACK_REPLAY_LIMIT = int(os.getenv('TAG_FEEDBACK_REPLAY_LIMIT', 50000))
+tag_feedback_store = TagFeedbackStore(learning_rate, TAG_FEEDBACK_OFFSET_WEIGHT)
 TEXT_WEIGHT = 0.7
 IMAGE_WEIGHT = 0.3
 SEED_WEIGHT_NEW_TAG = 1.0
@@ -488,136 +751,360 @@ MATURITY_THRESHOLD = 150
 NEW_CONFIDENCE_THRESHOLD = 0.25
 JUVENILE_CONFIDENCE_THRESHOLD = 0.5
 MATURE_CONFIDENCE_THRESHOLD = 0.8
+RECOMMEND_BATCH_MAX_ITEMS = int(os.getenv('RECOMMEND_BATCH_MAX_ITEMS', 256))
+
+def process_and_store_embeddings(question_ids):
+    """Embeds a batch of questions and upserts them in one executemany; returns the ids that were stored."""
+    if isinstance(question_ids, str):
+        question_ids = [question_ids]
+    question_ids = list(dict.fromkeys(question_ids))
+    if not question_ids:
+        return []
+
+    format_strings = ','.join(['%s'] * len(question_ids))
+    questions = fetch_from_db(
+        f"SELECT id, title, question, image FROM questions WHERE id IN ({format_strings})", tuple(question_ids)
+    )
+    if not questions:
+        return []
+
+    txt_embs = compute_text_embeddings([(q['title'] or '') + ' ' + (q['question'] or '') for q in questions])
+    img_embs = [None] * len(questions)
+    image_paths = {}
+    for i, q_data in enumerate(questions):
+        if q_data.get('image'):
+            full_image_path = question_image_path(q_data['image'])
+            if full_image_path:
+                image_paths[i] = full_image_path
+            else:
+                print("Warning: PUBLIC_PATH environment variable not set. Cannot process image.")
+    for i, img_emb in zip(image_paths, compute_image_embeddings(image_paths.values())):
+        img_embs[i] = img_emb
 
-@lru_cache(maxsize=1024)
-def compute_text_embedding(text: str) -> np.ndarray:
-    return text_model.encode(text)
-
-def compute_image_embedding(image_source) -> np.ndarray:
+    preprocessed = preprocess_for_storage(
+        [(q['title'] or '', q['question'] or '') for q in questions], *nlp_models_resource.get()
+    )
+    rows = [
+        (q['id'], encode_text_embedding(txt_emb), encode_image_embedding(img_emb)) + clean
+        for q, txt_emb, img_emb, clean in zip(questions, txt_embs, img_embs, preprocessed)
+    ]
+    conn = conn_pool.get_connection()
     try:
-        img = Image.open(image_source).convert('RGB')
-        tensor = preprocess(img).unsqueeze(0)
-        with torch.no_grad():
-            feat = image_model(tensor).squeeze().numpy()
-        return feat
+        cur = conn.cursor()
+        cur.executemany(QUESTION_EMBEDDING_UPSERT, rows)
+        conn.commit()
+        cur.close()
+    finally:
+        conn.close()
+    stored_ids = [q['id'] for q in questions]
+    print(f"Stored embeddings for {len(stored_ids)} question(s).")
+    try:
+        index_stored_questions(stored_ids, txt_embs)
     except Exception as e:
-        print(f"Error computing image embedding: {e}")
-        return None
+        # The periodic index refresh picks these rows up from the database instead.
+        print(f"Could not add questions to the similarity index: {e}")
+    return stored_ids
 
-def process_and_store_embeddings(question_id: str):
-    conn = conn_pool.get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("SELECT title, question, image FROM questions WHERE id = %s", (question_id,))
-    q_data = cur.fetchone()
-    if not q_data:
-        cur.close(); conn.close()
-        return
-
-    txt_emb = compute_text_embedding((q_data['title'] or '') + ' ' + (q_data['question'] or ''))
-    img_emb = None
-    if q_data.get('image'):
-        laravel_public_path = os.getenv('PUBLIC_PATH', '../public')
-        if laravel_public_path:
-            full_image_path = os.path.join(laravel_public_path, 'storage', q_data['image'])
-            print(f"Attempting to load image from: {full_image_path}")
-            img_emb = compute_image_embedding(full_image_path)
-        else:
-            print("Warning: PUBLIC_PATH environment variable not set. Cannot process image.")
-
-    cur.execute(
-        """
-        INSERT INTO question_embeddings (question_id, text_embedding, image_embedding)
-        VALUES (%s, %s, %s) ON DUPLICATE KEY UPDATE
-        text_embedding = VALUES(text_embedding), image_embedding = VALUES(image_embedding)
-        """, (question_id, txt_emb.tobytes(), img_emb.tobytes() if img_emb is not None else None)
-    )
-    conn.commit()
-    cur.close(); conn.close()
-    print(f"Stored embeddings for question {question_id}.")
+class EmbeddingJobQueue:
+    """
+    Bounded queue of question ids drained by a fixed pool of workers.
+    Each worker waits for one id, then collects more for up to `linger` seconds so that a burst of
+    requests is embedded and written as one micro-batch.
+    """
+
+    def __init__(self, handler, maxsize=1000, workers=2, batch_size=32, linger=0.2, history=10000):
+        self.handler = handler
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.workers = workers
+        self.batch_size = batch_size
+        self.linger = linger
+        self.history = history
+        self.statuses = OrderedDict()
+        self.lock = threading.Lock()
+        self.started = False
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        for i in range(self.workers):
+            threading.Thread(target=self._run, name=f"embedding-worker-{i}", daemon=True).start()
+
+    def submit(self, question_id) -> bool:
+        """Queues a question id; returns False when the queue is full."""
+        with self.lock:
+            # A job that is still waiting will read the latest row anyway, so don't queue it twice.
+            if self.statuses.get(question_id, {}).get('status') == 'queued':
+                return True
+            try:
+                self.queue.put_nowait(question_id)
+            except queue.Full:
+                return False
+            self._set_status(question_id, 'queued')
+        return True
+
+    def depth(self) -> int:
+        return self.queue.qsize()
+
+    def status(self, question_id):
+        with self.lock:
+            return self.statuses.get(question_id)
+
+    def _set_status(self, question_id, status, error=None):
+        entry = {'status': status, 'updated_at': time.time()}
+        if error:
+            entry['error'] = error
+        self.statuses.pop(question_id, None)
+        self.statuses[question_id] = entry
+        while len(self.statuses) > self.history:
+            self.statuses.popitem(last=False)
+
+    def _next_batch(self):
+        batch = [self.queue.get()]
+        deadline = time.monotonic() + self.linger
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            question_ids = list(dict.fromkeys(batch))
+            with self.lock:
+                for qid in question_ids:
+                    self._set_status(qid, 'processing')
+            try:
+                stored = set(self.handler(question_ids) or [])
+                with self.lock:
+                    for qid in question_ids:
+                        self._set_status(qid, 'done' if qid in stored else 'not_found')
+            except Exception as e:
+                print(f"Error processing embedding batch of {len(question_ids)} question(s): {e}")
+                with self.lock:
+                    for qid in question_ids:
+                        self._set_status(qid, 'failed', str(e))
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+embedding_jobs = EmbeddingJobQueue(
+    process_and_store_embeddings,
+    maxsize=int(os.getenv('EMBEDDING_QUEUE_SIZE', 1000)),
+    workers=int(os.getenv('EMBEDDING_WORKERS', 2)),
+    batch_size=int(os.getenv('EMBEDDING_BATCH_SIZE', 32)),
+    linger=float(os.getenv('EMBEDDING_BATCH_LINGER', 0.2))
+)
+
+TAG_EMBEDDINGS_QUERY = """
+    SELECT sq.tag_id, qe.text_embedding, qe.image_embedding
+    FROM subject_questions sq
+    JOIN question_embeddings qe ON sq.question_id = qe.question_id
+    JOIN questions q ON q.id = sq.question_id AND q.deleted_at IS NULL
+    WHERE (qe.created_at IS NULL OR qe.created_at <= %s)
+      AND (sq.created_at IS NULL OR sq.created_at <= %s)
+"""
+
+def accumulate_tag_embeddings(cur, aggregates, query, params):
+    """Streams (tag_id, embeddings) rows into per-tag running sums without materializing the result set."""
+    cur.execute(query, params)
+    while True:
+        rows = cur.fetchmany(TAG_MODEL_FETCH_SIZE)
+        if not rows:
+            break
+        for row in rows:
+            agg = aggregates.get(row['tag_id'])
+            text_emb = decode_embedding(row['text_embedding'])
+            if agg is None:
+                agg = {'text_sum': np.zeros(text_emb.shape, dtype=np.float64), 'image_sum': None, 'count': 0, 'image_count': 0}
+                aggregates[row['tag_id']] = agg
+            agg['text_sum'] += text_emb
+            agg['count'] += 1
+            if row['image_embedding']:
+                image_emb = decode_embedding(row['image_embedding'])
+                if agg['image_sum'] is None:
+                    agg['image_sum'] = np.zeros(image_emb.shape, dtype=np.float64)
+                agg['image_sum'] += image_emb
+                agg['image_count'] += 1
+
+def refresh_tag_aggregates(cur, previous_watermark, watermark):
+    """
+    Applies everything committed between the two watermarks to tag_aggregates.
+    A (tag, question) pair is counted once both its embedding row and its subject_questions row
+    were created at or before the watermark. Pairs whose embedding was rewritten, or whose question was
+    (soft) deleted, since the previous watermark cannot be subtracted, so their tags are recomputed.
+    """
+    cur.execute("""
+        SELECT sq.tag_id
+        FROM question_embeddings qe
+        JOIN subject_questions sq ON sq.question_id = qe.question_id
+        WHERE qe.updated_at > %s AND qe.updated_at <= %s
+          AND (qe.created_at IS NULL OR qe.created_at <= %s)
+        UNION
+        SELECT sq.tag_id
+        FROM questions q
+        JOIN subject_questions sq ON sq.question_id = q.id
+        WHERE q.deleted_at > %s AND q.deleted_at <= %s
+    """, (previous_watermark, watermark, previous_watermark, previous_watermark, watermark))
+    dirty_tags = [row['tag_id'] for row in cur.fetchall()]
+
+    exclude_dirty = ""
+    if dirty_tags:
+        format_strings = ','.join(['%s'] * len(dirty_tags))
+        exclude_dirty = f" AND sq.tag_id NOT IN ({format_strings})"
+        for tid in dirty_tags:
+            tag_aggregates.pop(tid, None)
+        accumulate_tag_embeddings(cur, tag_aggregates,
+                                  TAG_EMBEDDINGS_QUERY + f" AND sq.tag_id IN ({format_strings})",
+                                  (watermark, watermark, *dirty_tags))
+
+    accumulate_tag_embeddings(cur, tag_aggregates,
+                              TAG_EMBEDDINGS_QUERY + " AND (qe.created_at > %s OR sq.created_at > %s)" + exclude_dirty,
+                              (watermark, watermark, previous_watermark, previous_watermark, *dirty_tags))
+    return len(dirty_tags)
 
 def update_tag_model():
+    global tag_model_watermark, tag_model_last_full_rebuild
     conn = conn_pool.get_connection()
-    cur = conn.cursor(dictionary=True)
-    cur.execute("""
-        SELECT sq.tag_id, qe.text_embedding, qe.image_embedding
-        FROM subject_questions sq 
-        JOIN question_embeddings qe ON sq.question_id = qe.question_id
-    """)
-    rows = cur.fetchall()
-    aggregates = {}
-    for row in rows:
-        tid = row['tag_id']
-        aggregates.setdefault(tid, {'texts': [], 'images': [], 'count': 0})
-        text_emb = np.frombuffer(row['text_embedding'], dtype=np.float32)
-        aggregates[tid]['texts'].append(text_emb)
-        if row['image_embedding']:
-            image_emb = np.frombuffer(row['image_embedding'], dtype=np.float32)
-            aggregates[tid]['images'].append(image_emb)
-        aggregates[tid]['count'] += 1
-    cur.execute("SELECT id, name, abbreviation, description FROM tags")
-    all_tags = cur.fetchall()
-    cur.close(); conn.close()
+    try:
+        cur = conn.cursor(dictionary=True)
+        watermark = db_watermark(cur)
+
+        full_rebuild = (tag_model_watermark is None or tag_model_rebuild_requested.is_set()
+                        or time.time() - tag_model_last_full_rebuild >= TAG_MODEL_FULL_REBUILD_INTERVAL)
+        if full_rebuild:
+            tag_model_rebuild_requested.clear()
+            # Removed tag links and deleted questions are only picked up here.
+            tag_aggregates.clear()
+            accumulate_tag_embeddings(cur, tag_aggregates, TAG_EMBEDDINGS_QUERY, (watermark, watermark))
+            tag_model_last_full_rebuild = time.time()
+            print(f"Tag aggregates rebuilt from a full scan ({len(tag_aggregates)} tags).")
+        else:
+            dirty_count = refresh_tag_aggregates(cur, tag_model_watermark, watermark)
+            print(f"Tag aggregates refreshed since {tag_model_watermark} ({dirty_count} tags recomputed).")
+
+        cur.execute("SELECT id, name, abbreviation, description FROM tags")
+        all_tags = cur.fetchall()
+        cur.close()
+    except Exception:
+        # The aggregates may be half-applied; start over from a full scan next time.
+        tag_model_watermark = None
+        raise
+    finally:
+        conn.close()
+    tag_model_watermark = watermark
+
+    tag_ids, text_rows, image_rows, counts = [], [], [], []
+    for tag in all_tags:
+        tid = tag['id']
+        text_parts = [tag['name']]
+        if tag.get('abbreviation'): text_parts.append(tag['abbreviation'])
+        if tag.get('description'): text_parts.append(tag['description'])
+        seed_text = ' '.join(text_parts)
+        cached_seed = tag_seed_embeddings.get(tid)
+        if cached_seed is None or cached_seed[0] != seed_text:
+            cached_seed = (seed_text, compute_text_embedding(seed_text))
+            tag_seed_embeddings[tid] = cached_seed
+        seed_text_embedding = cached_seed[1]
+
+        tag_data = tag_aggregates.get(tid)
+        if tag_data and tag_data['count']:
+            question_count = tag_data['count']
+            if question_count < JUVENILE_THRESHOLD:
+                seed_weight = SEED_WEIGHT_NEW_TAG
+            elif question_count < MATURITY_THRESHOLD:
+                seed_weight = SEED_WEIGHT_JUVENILE_TAG
+            else:
+                seed_weight = SEED_WEIGHT_MATURE_TAG
+            history_weight = 1.0 - seed_weight
+            questions_mean_text = tag_data['text_sum'] / question_count
+            text_rows.append((seed_weight * seed_text_embedding) + (history_weight * questions_mean_text))
+            image_rows.append(tag_data['image_sum'] / tag_data['image_count'] if tag_data['image_count'] else None)
+            counts.append(question_count)
+        else:
+            text_rows.append(seed_text_embedding)
+            image_rows.append(None)
+            counts.append(0)
+        tag_ids.append(tid)
+
+    live_tags = set(tag_ids)
+    for tid in [tid for tid in tag_seed_embeddings if tid not in live_tags]:
+        del tag_seed_embeddings[tid]
+
+    new_prototypes = build_prototype_matrix(tag_ids, text_rows, image_rows, counts)
     with model_lock:
         global tag_prototypes
-        new_prototypes = {}
-        for tag in all_tags:
-            tid = tag['id']
-            text_parts = [tag['name']]
-            if tag.get('abbreviation'): text_parts.append(tag['abbreviation'])
-            if tag.get('description'): text_parts.append(tag['description'])
-            seed_text_embedding = compute_text_embedding(' '.join(text_parts))
-            
-            tag_data = aggregates.get(tid)
-            if tag_data and tag_data['texts']:
-                question_count = tag_data['count']
-                if question_count < JUVENILE_THRESHOLD:
-                    seed_weight = SEED_WEIGHT_NEW_TAG
-                elif question_count < MATURITY_THRESHOLD:
-                    seed_weight = SEED_WEIGHT_JUVENILE_TAG
-                else:
-                    seed_weight = SEED_WEIGHT_MATURE_TAG
-                history_weight = 1.0 - seed_weight
-                questions_mean_text = np.mean(tag_data['texts'], axis=0)
-                hybrid_text_prototype = (seed_weight * seed_text_embedding) + (history_weight * questions_mean_text)
-                hybrid_image_prototype = np.mean(tag_data['images'], axis=0) if tag_data['images'] else None
-                new_prototypes[tid] = {
-                    'text':  hybrid_text_prototype,
-                    'image': hybrid_image_prototype,
-                    'count': question_count
-                }
-            else:
-                new_prototypes[tid] = {
-                    'text': seed_text_embedding, 
-                    'image': None,
-                    'count': 0 
-                }
+        tag_feedback_store.apply_to(new_prototypes)
         tag_prototypes = new_prototypes
-    print("Tag prototypes updated successfully.")
-    
-def get_all_tags_score(txt_emb: np.ndarray, img_emb: np.ndarray):
-    if txt_emb is None: return []
-    scores = []
-    with model_lock:
-        if not tag_prototypes: return []
-        for tid, proto in tag_prototypes.items():
-            t_sim = np.dot(txt_emb, proto['text']) / (np.linalg.norm(txt_emb) * np.linalg.norm(proto['text']))
-            i_sim = 0
-            if img_emb is not None and proto['image'] is not None:
-                norm_img = np.linalg.norm(img_emb)
-                norm_proto = np.linalg.norm(proto['image'])
-                if norm_img > 0 and norm_proto > 0:
-                    i_sim = np.dot(img_emb, proto['image']) / (norm_img * norm_proto)
-            score = TEXT_WEIGHT * t_sim + IMAGE_WEIGHT * i_sim
-            if np.random.rand() < epsilon: score = score * np.random.rand()
-            scores.append((tid, score, proto['count']))
-    scores.sort(key=lambda x: x[1], reverse=True)
-    return scores
+    print(f"Tag prototypes updated successfully ({len(new_prototypes)} tags).")
+
+def build_prototype_matrix(tag_ids, text_rows, image_rows, counts) -> TagPrototypeMatrix:
+    if not tag_ids:
+        return TagPrototypeMatrix.empty()
+    text_matrix = normalize_rows(np.vstack(text_rows))
+    has_image = np.array([img is not None for img in image_rows], dtype=bool)
+    image_matrix = None
+    if has_image.any():
+        image_dim = next(img for img in image_rows if img is not None).shape[0]
+        image_matrix = np.zeros((len(tag_ids), image_dim), dtype=np.float32)
+        image_matrix[has_image] = normalize_rows(np.vstack([img for img in image_rows if img is not None]))
+    return TagPrototypeMatrix(tag_ids, text_matrix, image_matrix, has_image, np.asarray(counts, dtype=np.int64))
+
+def score_tags_batch(txt_embs: np.ndarray, img_embs=None):
+    """Scores N queries against every tag prototype; returns the prototype snapshot and an (N, n_tags) matrix."""
+    # update_tag_model swaps in a whole new matrix, so a local reference is a consistent snapshot.
+    prototypes = tag_prototypes
+    txt_embs = np.atleast_2d(txt_embs)
+    if not len(prototypes):
+        return prototypes, np.zeros((txt_embs.shape[0], 0), dtype=np.float32)
+    scores = TEXT_WEIGHT * (normalize_rows(txt_embs) @ prototypes.text_matrix.T)
+    if img_embs is not None and prototypes.image_matrix is not None:
+        with_image = [i for i, emb in enumerate(img_embs) if emb is not None]
+        if with_image:
+            # Tags without an image prototype have zero rows, so their image similarity stays 0.
+            image_queries = normalize_rows(np.vstack([img_embs[i] for i in with_image]))
+            scores[with_image] += IMAGE_WEIGHT * (image_queries @ prototypes.image_matrix.T)
+    explore = exploration_rng.random(scores.shape) < epsilon
+    scores[explore] *= exploration_rng.random(int(explore.sum()))
+    return prototypes, scores
+
+def confidence_thresholds(counts: np.ndarray) -> np.ndarray:
+    return np.where(counts < JUVENILE_THRESHOLD, NEW_CONFIDENCE_THRESHOLD,
+                    np.where(counts < MATURITY_THRESHOLD, JUVENILE_CONFIDENCE_THRESHOLD, MATURE_CONFIDENCE_THRESHOLD))
+
+def recommended_tag_ids(prototypes, scores, passed):
+    """Tags whose score passed their threshold, best first; the single best tag if none did."""
+    rows = np.flatnonzero(passed)
+    if rows.size:
+        rows = rows[np.argsort(-scores[rows], kind='stable')]
+    else:
+        rows = [int(np.argmax(scores))]
+    return [prototypes.tag_ids[r] for r in rows]
+
+def fetch_tag_names(tag_ids):
+    if not tag_ids:
+        return {}
+    format_strings = ','.join(['%s'] * len(tag_ids))
+    rows = fetch_from_db(f"SELECT id, name FROM tags WHERE id IN ({format_strings})", tuple(tag_ids))
+    return {tag['id']: tag['name'] for tag in rows}
 
 @tag_bp.route('/recommend_tags', methods=['POST'])
 def recommend_tags():
+    warming_up = not_ready_response(text_model_resource, tag_prototypes_resource)
+    if warming_up:
+        return warming_up
+
     title = request.form.get('title', '')
     question_text = request.form.get('question', '')
     image_file = request.files.get('image')
+    if image_file and image_file.filename != '':
+        warming_up = not_ready_response(image_model_resource)
+        if warming_up:
+            return warming_up
     
     full_text = title + ' ' + question_text
     txt_emb = compute_text_embedding(full_text)
@@ -626,37 +1113,70 @@ def recommend_tags():
     if image_file and image_file.filename != '':
         img_emb = compute_image_embedding(image_file.stream)
     
-    all_scored_tags  = get_all_tags_score(txt_emb, img_emb)
-    if not all_scored_tags :
+    prototypes, scores = score_tags_batch(txt_emb, [img_emb])
+    if not len(prototypes):
         return jsonify(success=True, recommended_tags=[])
     
-    recommended_ids = []
-    for tid, score, count in all_scored_tags:
-        if count < JUVENILE_THRESHOLD:
-            dynamic_threshold = NEW_CONFIDENCE_THRESHOLD
-        elif count < MATURITY_THRESHOLD:
-            dynamic_threshold = JUVENILE_CONFIDENCE_THRESHOLD
-        else:
-            dynamic_threshold = MATURE_CONFIDENCE_THRESHOLD
-        if score >= dynamic_threshold:
-            recommended_ids.append(tid)
-    
-    for tid, score, count in all_scored_tags:
-        print(f"{tid} {score}")
-        
-    if not recommended_ids and all_scored_tags:
-        best_tag_id = all_scored_tags[0][0] 
-        recommended_ids = [best_tag_id]
-    
-    conn = conn_pool.get_connection()
-    cur = conn.cursor(dictionary=True)
-    format_strings = ','.join(['%s'] * len(recommended_ids))
-    cur.execute(f"SELECT id, name FROM tags WHERE id IN ({format_strings})", tuple(recommended_ids))
-    tags_from_db = {tag['id']: tag['name'] for tag in cur.fetchall()}
-    cur.close(); conn.close()
+    scores = scores[0]
+    recommended_ids = recommended_tag_ids(prototypes, scores, scores >= confidence_thresholds(prototypes.counts))
+    tags_from_db = fetch_tag_names(recommended_ids)
     response_data = [{"id": tid, "name": tags_from_db.get(tid, "Unknown Tag")} for tid in recommended_ids]
     return jsonify(success=True, recommended_tags=response_data)
 
+def batch_item_image_source(item):
+    if item.get('image'):
+        b64_string = item['image']
+        if "," in b64_string:
+            b64_string = b64_string.split(',')[1]
+        return io.BytesIO(base64.b64decode(b64_string))
+    if item.get('image_path'):
+        return question_image_path(item['image_path'])
+    return None
+
+@tag_bp.route('/recommend_tags_batch', methods=['POST'])
+def recommend_tags_batch():
+    """
+    Recommends tags for many questions in one call.
+    Expects: { "items": [{ "title": str, "question": str, "image": "b64_img" | "image_path": str }, ...] }
+    """
+    data = request.get_json(silent=True) or {}
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify(success=False, message="A non-empty list of items is required."), 400
+    if len(items) > RECOMMEND_BATCH_MAX_ITEMS:
+        return jsonify(success=False, message=f"At most {RECOMMEND_BATCH_MAX_ITEMS} items are allowed per batch."), 400
+    needed = [text_model_resource, tag_prototypes_resource]
+    if any(item.get('image') or item.get('image_path') for item in items):
+        needed.append(image_model_resource)
+    warming_up = not_ready_response(*needed)
+    if warming_up:
+        return warming_up
+
+    try:
+        texts = [f"{item.get('title') or ''} {item.get('question') or ''}" for item in items]
+        txt_embs = compute_text_embeddings(texts)
+        image_sources = {i: source for i, source in enumerate(map(batch_item_image_source, items)) if source is not None}
+        img_embs = [None] * len(items)
+        for i, img_emb in zip(image_sources, compute_image_embeddings(image_sources.values())):
+            img_embs[i] = img_emb
+
+        prototypes, scores = score_tags_batch(txt_embs, img_embs)
+        if not len(prototypes):
+            return jsonify(success=True, results=[{"recommended_tags": []} for _ in items])
+
+        passed = scores >= confidence_thresholds(prototypes.counts)
+        recommended_rows = [recommended_tag_ids(prototypes, scores[i], passed[i]) for i in range(scores.shape[0])]
+
+        tags_from_db = fetch_tag_names(sorted({tid for tids in recommended_rows for tid in tids}))
+        results = [
+            {"recommended_tags": [{"id": tid, "name": tags_from_db.get(tid, "Unknown Tag")} for tid in tids]}
+            for tids in recommended_rows
+        ]
+        return jsonify(success=True, results=results)
+    except Exception as e:
+        print(f"Error in recommend_tags_batch: {e}")
+        return jsonify(success=False, message=f"An error occurred: {e}"), 500
+
 @tag_bp.route('/process_embeddings', methods=['POST'])
 def trigger_embedding_processing():
     data = request.json
@@ -664,11 +1184,31 @@ def trigger_embedding_processing():
     if not qid:
         return jsonify(success=False, message="question_id is required"), 400
     try:
-        threading.Thread(target=process_and_store_embeddings, args=(qid,)).start()
-        return jsonify(success=True, message="Embedding processing started."), 202
+        if not embedding_jobs.submit(qid):
+            response = jsonify(success=False, message="Embedding queue is full, retry later.", queue_depth=embedding_jobs.depth())
+            response.headers['Retry-After'] = '5'
+            return response, 429
+        return jsonify(success=True, message="Embedding processing queued.", queue_depth=embedding_jobs.depth()), 202
     except Exception as e:
         return jsonify(success=False, message=f"Failed to start embedding process: {e}"), 500
 
+@tag_bp.route('/remove_question', methods=['POST'])
+def remove_question():
+    data = request.json
+    qid = data.get('question_id')
+    if not qid:
+        return jsonify(success=False, message="question_id is required"), 400
+    forget_questions([qid])
+    return jsonify(success=True, message="Question removed from the in-memory indexes.")
+
+@tag_bp.route('/process_embeddings/status', methods=['GET'])
+def embedding_processing_status():
+    qid = request.args.get('question_id')
+    data = {"queue_depth": embedding_jobs.depth(), "queue_capacity": embedding_jobs.queue.maxsize}
+    if qid:
+        data["job"] = embedding_jobs.status(qid)
+    return jsonify(success=True, data=data)
+
 @tag_bp.route('/tag_feedback', methods=['POST'])
 def tag_feedback():
     title = request.form.get('title', '')
@@ -679,6 +1219,12 @@ def tag_feedback():
 
     if not selected_tags and not recommended_tags:
          return jsonify(success=False, message="selected_tags and recommended_tags are required"), 400
+    needed = [text_model_resource, tag_prototypes_resource]
+    if image_file and image_file.filename != '':
+        needed.append(image_model_resource)
+    warming_up = not_ready_response(*needed)
+    if warming_up:
+        return warming_up
 
     try:
         full_text = title + ' ' + question_text
@@ -690,39 +1236,35 @@ def tag_feedback():
             
         tags_to_punish = recommended_tags - selected_tags
         with model_lock:
-            for tid in selected_tags:
-                if tid in tag_prototypes:
-                    proto_text = tag_prototypes[tid]['text']
-                    new_proto_text = proto_text + learning_rate * 1.0 * (text_emb - proto_text)
-                    norm = np.linalg.norm(new_proto_text)
-                    if norm > 0:
-                        tag_prototypes[tid]['text'] = new_proto_text / norm
-                    if img_emb is not None and tag_prototypes[tid]['image'] is not None:
-                        proto_image = tag_prototypes[tid]['image']
-                        new_proto_image = proto_image + learning_rate * 1.0 * (img_emb - proto_image)
-                        norm = np.linalg.norm(new_proto_image)
-                        if norm > 0:
-                            tag_prototypes[tid]['image'] = new_proto_image / norm
-
-            for tid in tags_to_punish:
-                if tid in tag_prototypes:
-                    proto_text = tag_prototypes[tid]['text']
-                    new_proto_text = proto_text + learning_rate * -1.0 * (text_emb - proto_text)
-                    norm = np.linalg.norm(new_proto_text)
-                    if norm > 0:
-                        tag_prototypes[tid]['text'] = new_proto_text / norm
-                    if img_emb is not None and tag_prototypes[tid]['image'] is not None:
-                        proto_image = tag_prototypes[tid]['image']
-                        new_proto_image = proto_image + learning_rate * -1.0 * (img_emb - proto_image)
-                        norm = np.linalg.norm(new_proto_image)
-                        if norm > 0:
-                            tag_prototypes[tid]['image'] = new_proto_image / norm
-                            
+            touched = tag_feedback_store.record(text_emb, img_emb, selected_tags, tags_to_punish)
+            tag_feedback_store.apply_to(tag_prototypes, touched)
+
         return jsonify(success=True, message="Feedback processed and model updated in memory.")
     except Exception as e:
         print(f"Error in tag_feedback: {e}")
         return jsonify(success=False, message=f"An error occurred: {e}"), 500   
             
+@tag_bp.route('/embedding_cache/stats', methods=['GET'])
+def embedding_cache_stats():
+    if embeddings.text_embedding_cache is None:
+        return jsonify(success=False, message="Text embedding cache is not open (disabled or text model not loaded yet)."), 404
+    return jsonify(success=True, stats=embeddings.text_embedding_cache.stats())
+
+def load_tag_feedback():
+    replayed = tag_feedback_store.replay_from_db()
+    with model_lock:
+        tag_feedback_store.apply_to(tag_prototypes)
+    print(f"Replayed {replayed} stored tag feedback event(s).")
+    return True
+
+def flush_tag_feedback_periodically(interval=5):
+    while True:
+        time.sleep(interval)
+        tag_feedback_store.flush()
+
+tag_prototypes_resource = LazyResource('tag_prototypes', update_tag_model)
+tag_feedback_resource = LazyResource('tag_feedback', load_tag_feedback)
+
 def monitor_tag_model_db(interval=300):
     while True:
         try:
@@ -739,6 +1281,14 @@ MODEL_NAME = 'VGG-Face'
 DISTANCE_METRIC = 'cosine'
 DISTANCE_THRESHOLD = 0.4
 
+def load_face_model():
+    # Importing DeepFace pulls in TensorFlow; building the model downloads/loads the VGG-Face weights.
+    from deepface import DeepFace
+    DeepFace.build_model(MODEL_NAME)
+    return DeepFace
+
+face_model_resource = LazyResource('face_model', load_face_model, required=False)
+
 def b64_to_image(b64_string):
     if "," in b64_string:
         b64_string = b64_string.split(',')[1]
@@ -751,6 +1301,10 @@ def b64_to_image(b64_string):
 def register_face():
     if not conn_pool:
         return jsonify(success=False, message="Database connection not available."), 500
+    warming_up = not_ready_response(face_model_resource)
+    if warming_up:
+        return warming_up
+    DeepFace = face_model_resource.get()
 
     data = request.json
     user_id = data.get('user_id')
@@ -810,6 +1364,10 @@ def login_face():
     """
     if not conn_pool:
         return jsonify(success=False, message="Database connection not available."), 500
+    warming_up = not_ready_response(face_model_resource)
+    if warming_up:
+        return warming_up
+    DeepFace = face_model_resource.get()
 
     data = request.json
     image_b64 = data.get('image')
@@ -871,34 +1429,297 @@ def login_face():
         return jsonify(success=False, message="Face not recognized or does not match any user.")
 
 #question-similarity
-def load_model_if_needed():
-    """Checks if the model file on disk is newer and reloads it safely."""
-    global duplicate_classifier_model, model_last_reloaded
-    if not os.path.exists(MODEL_PATH):
-        return
-    disk_last_modified = os.path.getmtime(MODEL_PATH)
-    if disk_last_modified > model_last_reloaded:
-        with model_lock:
-            if os.path.getmtime(MODEL_PATH) > model_last_reloaded:
-                print("New model file detected. Reloading...")
-                try:
-                    duplicate_classifier_model = joblib.load(MODEL_PATH)
-                    model_last_reloaded = time.time()
-                    print("Duplicate detection model reloaded successfully.")
-                except Exception as e:
-                    print(f"CRITICAL ERROR: Failed to reload model: {e}")
-                    
+# Optional cascade: of the DUPLICATE_CANDIDATE_K nearest questions, only the DUPLICATE_RERANK_K most
+# similar with a text cosine of at least DUPLICATE_MIN_COSINE get full features and the classifier.
+# The defaults cut nothing, so every candidate in the tags is scored as before; operators can tighten
+# them once they have checked how many p > 0.5 pairs a cut loses on the labeled pairs. 0 means no limit.
+DUPLICATE_CANDIDATE_K = int(os.getenv('DUPLICATE_CANDIDATE_K', 0))
+DUPLICATE_RERANK_K = int(os.getenv('DUPLICATE_RERANK_K', 0))
+DUPLICATE_MIN_COSINE = float(os.getenv('DUPLICATE_MIN_COSINE', -1))
+QUESTION_INDEX_REFRESH_INTERVAL = int(os.getenv('QUESTION_INDEX_REFRESH_INTERVAL', 60))
+QUESTION_INDEX_FULL_REBUILD_INTERVAL = int(os.getenv('QUESTION_INDEX_FULL_REBUILD_INTERVAL', 24 * 60 * 60))
+
+def new_question_index():
+    return VectorIndex(
+        nprobe=int(os.getenv('QUESTION_INDEX_NPROBE', 8)),
+        exact_max=int(os.getenv('QUESTION_INDEX_EXACT_MAX', 20000))
+    )
+
+question_index = new_question_index()
+question_index_watermark = None
+question_index_last_full_rebuild = 0
+
+def group_question_tags(rows):
+    tags = {}
+    for row in rows:
+        tags.setdefault(row['question_id'], set()).add(row['tag_id'])
+    return tags
+
+def index_stored_questions(question_ids, txt_embs):
+    format_strings = ','.join(['%s'] * len(question_ids))
+    tag_rows = fetch_from_db(
+        f"SELECT question_id, tag_id FROM subject_questions WHERE question_id IN ({format_strings})", tuple(question_ids)
+    )
+    # Every question gets its full current tag set, so removed tag links are dropped too.
+    tags = group_question_tags(tag_rows)
+    tags = {qid: tags.get(qid, ()) for qid in question_ids}
+    question_index.add(question_ids, txt_embs, tags=tags)
+    candidate_store.set_memberships(tags)
+
+def fetch_deleted_question_ids(since, cur=None):
+    query, params = "SELECT id FROM questions WHERE deleted_at >= %s", (since,)
+    if cur is None:
+        return [row['id'] for row in fetch_from_db(query, params)]
+    cur.execute(query, params)
+    return [row['id'] for row in cur.fetchall()]
+
+def forget_questions(question_ids):
+    """Drops deleted questions from the duplicate index, the candidate store and (at its next update) the tag model."""
+    question_index.remove(question_ids)
+    candidate_store.remove_questions(question_ids)
+    tag_model_rebuild_requested.set()
+
+def load_question_index_rows(cur, index, since=None):
+    """Streams text embeddings (all, or those written since the watermark) and their tags into the index."""
+    query = """
+        SELECT qe.question_id, qe.text_embedding FROM question_embeddings qe
+        JOIN questions q ON q.id = qe.question_id AND q.deleted_at IS NULL
+    """
+    params = ()
+    if since is not None:
+        query += " WHERE qe.updated_at >= %s"
+        params = (since,)
+    cur.execute(query, params)
+    loaded = 0
+    while True:
+        rows = cur.fetchmany(TAG_MODEL_FETCH_SIZE)
+        if not rows:
+            break
+        ids, vectors = [], []
+        for row in rows:
+            vec = decode_embedding(row['text_embedding'])
+            if vec is not None:
+                ids.append(row['question_id'])
+                vectors.append(vec)
+        if ids:
+            index.add(ids, np.vstack(vectors))
+            loaded += len(ids)
+
+    if since is None:
+        cur.execute("SELECT question_id, tag_id FROM subject_questions")
+    else:
+        cur.execute("""
+            SELECT question_id, tag_id FROM subject_questions
+            WHERE question_id IN (
+                SELECT question_id FROM subject_questions WHERE created_at >= %s
+                UNION SELECT question_id FROM question_embeddings WHERE updated_at >= %s
+            )
+        """, (since, since))
+    index.set_tags(group_question_tags(cur.fetchall()))
+    return loaded
+
+def update_question_index():
+    global question_index, question_index_watermark, question_index_last_full_rebuild
+    full_rebuild = (question_index_watermark is None
+                    or time.time() - question_index_last_full_rebuild >= QUESTION_INDEX_FULL_REBUILD_INTERVAL)
+    # A full rebuild fills a fresh index and swaps it in, so searches keep using the old one meanwhile.
+    index = new_question_index() if full_rebuild else question_index
+    conn = conn_pool.get_connection()
+    try:
+        cur = conn.cursor(dictionary=True)
+        watermark = db_watermark(cur)
+        loaded = load_question_index_rows(cur, index, None if full_rebuild else question_index_watermark)
+        if not full_rebuild:
+            index.remove(fetch_deleted_question_ids(question_index_watermark, cur))
+        cur.close()
+    except Exception:
+        question_index_watermark = None
+        raise
+    finally:
+        conn.close()
+
+    if index.needs_training():
+        index.train()
+        print(f"Question index partitioned into {len(index.centroids)} lists.")
+    question_index = index
+    question_index_watermark = watermark
+    if full_rebuild:
+        question_index_last_full_rebuild = time.time()
+        print(f"Question index rebuilt with {len(index)} questions.")
+    elif loaded:
+        print(f"Question index refreshed with {loaded} new or updated questions.")
+    return True
+
+def monitor_question_index(interval=60):
+    while True:
+        time.sleep(interval)
+        try:
+            update_question_index()
+        except Exception as e:
+            print(f"Error during question index refresh: {e}")
+
+question_index_resource = LazyResource('question_index', update_question_index)
+
+CANDIDATE_STORE_MAX_BYTES = int(os.getenv('CANDIDATE_STORE_MAX_MB', 512)) * 1024 * 1024
+CANDIDATE_STORE_REFRESH_INTERVAL = int(os.getenv('CANDIDATE_STORE_REFRESH_INTERVAL', 60))
+CANDIDATE_QUERY = """
+    SELECT sq.tag_id, q.id, q.title, q.question, qe.text_embedding, qe.image_embedding,
+           qe.clean_title, qe.clean_question, qe.preprocess_version, qe.title_language, qe.question_language
+    FROM subject_questions sq
+    JOIN questions q ON q.id = sq.question_id AND q.deleted_at IS NULL
+    JOIN question_embeddings qe ON qe.question_id = q.id
+"""
+
+def candidate_from_row(row):
+    return {
+        'id': row['id'],
+        'title': row.get('title') or '',
+        'question': row.get('question') or '',
+        'text_emb': decode_embedding(row['text_embedding']),
+        'img_emb': decode_embedding(row['image_embedding']),
+        'preprocessed': stored_preprocessed(row),
+        'languages': stored_languages(row)
+    }
+
+def fetch_candidates(query, params, fetch_size=TAG_MODEL_FETCH_SIZE):
+    """Streams candidate rows; returns (database time just before the read, [(tag id, candidate)])."""
+    conn = conn_pool.get_connection()
+    try:
+        cur = conn.cursor(dictionary=True)
+        watermark = db_watermark(cur)
+        cur.execute(query, params)
+        results = []
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            results.extend((row['tag_id'], candidate_from_row(row)) for row in rows)
+        cur.close()
+    finally:
+        conn.close()
+    return watermark, results
+
+def load_tag_candidates(tag_id):
+    watermark, results = fetch_candidates(CANDIDATE_QUERY + " WHERE sq.tag_id = %s", (tag_id,))
+    return watermark, [candidate for _, candidate in results]
+
+candidate_store = CandidateStore(load_tag_candidates, CANDIDATE_STORE_MAX_BYTES)
+candidate_store_watermark = None
+candidate_store_last_reset = time.time()
+
+def refresh_candidate_store():
+    """
+    Applies embeddings and tag links changed since the last refresh to the loaded tags. Question edits
+    re-embed the question, so questions.updated_at (bumped by every view and vote) is not checked.
+    """
+    global candidate_store_watermark, candidate_store_last_reset
+    if time.time() - candidate_store_last_reset >= QUESTION_INDEX_FULL_REBUILD_INTERVAL:
+        # Deleted questions and removed tag links are only dropped here; tags reload on next use.
+        candidate_store.clear()
+        candidate_store_last_reset = time.time()
+    since = candidate_store.refresh_since(candidate_store_watermark)
+    loaded = candidate_store.loaded_tags()
+    if since is None or not loaded:
+        candidate_store_watermark = db_watermark()
+        return 0
+    format_strings = ','.join(['%s'] * len(loaded))
+    watermark, results = fetch_candidates(
+        CANDIDATE_QUERY + f"""
+        WHERE sq.tag_id IN ({format_strings})
+          AND (qe.updated_at >= %s OR sq.created_at >= %s)
+        """, tuple(loaded) + (since, since)
+    )
+    by_tag = {}
+    for tag_id, candidate in results:
+        by_tag.setdefault(tag_id, []).append(candidate)
+    candidate_store.apply_updates(by_tag)
+    candidate_store.remove_questions(fetch_deleted_question_ids(since))
+    candidate_store_watermark = watermark
+    return len(results)
+
+def monitor_candidate_store(interval=60):
+    while True:
+        time.sleep(interval)
+        try:
+            changed = refresh_candidate_store()
+            if changed:
+                print(f"Candidate store refreshed with {changed} changed row(s).")
+        except Exception as e:
+            print(f"Error during candidate store refresh: {e}")
+
+MODEL_WATCH_INTERVAL = int(os.getenv('MODEL_WATCH_INTERVAL', 30))
+duplicate_classifier_model = None
+duplicate_model_signature = None
+duplicate_model_reload_requested = threading.Event()
+
+def load_duplicate_classifier():
+    global duplicate_classifier_model, duplicate_model_signature
+    signature = artifact_signature()
+    duplicate_classifier_model = load_duplicate_model()
+    duplicate_model_signature = signature
+    print(f"Duplicate detection model loaded from {duplicate_classifier_model.source}.")
+    return True
+
+def watch_duplicate_model(interval=30):
+    """Loads and validates replaced model files in the background, then swaps the model reference."""
+    global duplicate_classifier_model, duplicate_model_signature
+    failed_signature = None
+    while True:
+        duplicate_model_reload_requested.wait(interval)
+        duplicate_model_reload_requested.clear()
+        signature = artifact_signature()
+        if signature == duplicate_model_signature or signature == failed_signature:
+            continue
+        print("New duplicate detection model files detected. Reloading...")
+        try:
+            new_model = load_duplicate_model()
+        except Exception as e:
+            print(f"ERROR: New model rejected, keeping the current one: {e}")
+            failed_signature = signature
+            continue
+        duplicate_classifier_model = new_model
+        duplicate_model_signature = signature
+        print(f"Duplicate detection model reloaded from {new_model.source}.")
+
+duplicate_classifier_resource = LazyResource('duplicate_classifier', load_duplicate_classifier)
+
 duplicate_bp = Blueprint('duplicate_detector', __name__, url_prefix='/ai')
+
+RETRAIN_NOTIFY_TOKEN = os.getenv('RETRAIN_NOTIFY_TOKEN', '')
+
+@duplicate_bp.route('/duplicate_model/reload', methods=['POST'])
+def request_duplicate_model_reload():
+    # Called by retrain_model.py when it has saved a new model; the watcher loads and swaps it.
+    # Only that worker should call this: it must send the shared token, or come from localhost if none is set.
+    if RETRAIN_NOTIFY_TOKEN:
+        if not hmac.compare_digest(request.headers.get('X-Retrain-Token', ''), RETRAIN_NOTIFY_TOKEN):
+            return jsonify(success=False, message="Forbidden."), 403
+    elif request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify(success=False, message="Forbidden."), 403
+    duplicate_model_reload_requested.set()
+    return jsonify(success=True, message="Model reload check scheduled."), 202
+
+@duplicate_bp.route('/candidate_store/stats', methods=['GET'])
+def candidate_store_stats():
+    return jsonify(success=True, stats=candidate_store.stats())
+
 @duplicate_bp.route('/find_similar_by_tags', methods=['POST'])
 def find_similar_by_tags():
-    load_model_if_needed()
-    if duplicate_classifier_model is None:
+    needed = [text_model_resource, nlp_models_resource, duplicate_classifier_resource, question_index_resource]
+    image_file = request.files.get('image')
+    if image_file and image_file.filename != '':
+        needed.append(image_model_resource)
+    warming_up = not_ready_response(*needed)
+    if warming_up:
+        return warming_up
+    model = duplicate_classifier_model
+    if model is None:
         return jsonify(success=False, message="Duplicate detection model is not ready."), 503
+    nlp_en, stemmer_id, stopword_remover_id = nlp_models_resource.get()
 
     title = request.form.get('title', '')
     question_text = request.form.get('question', '')
     tag_ids_str = request.form.get('tag_ids', '')
-    image_file = request.files.get('image')
 
     if not title or not tag_ids_str:
         return jsonify(success=False, message="Title and tag_ids are required."), 400
@@ -913,52 +1734,74 @@ def find_similar_by_tags():
     if not tag_ids:
         return jsonify(success=True, duplicates=[])
 
-    try:
-        conn = conn_pool.get_connection()
-        cur = conn.cursor(dictionary=True)
-
-        format_strings = ','.join(['%s'] * len(tag_ids))
-        query = f"""
-            SELECT q.id, q.title, q.question, qe.text_embedding, qe.image_embedding
-            FROM questions q
-            JOIN subject_questions sq ON q.id = sq.question_id
-            JOIN question_embeddings qe ON q.id = qe.question_id
-            WHERE sq.tag_id IN ({format_strings})
-            LIMIT 200; 
-        """
-        cur.execute(query, tuple(tag_ids))
-        candidates = cur.fetchall()
-        cur.close()
-        conn.close()
+    # Stage 1: the index scores every candidate in the tags by text cosine in one pass.
+    nearest = question_index.search(q1_text_emb, DUPLICATE_CANDIDATE_K or sys.maxsize, tag_ids)
+    survivors = [qid for qid, cosine in nearest if cosine >= DUPLICATE_MIN_COSINE]
+    if DUPLICATE_RERANK_K:
+        survivors = survivors[:DUPLICATE_RERANK_K]
+    stages = {'retrieved': len(nearest), 'prefiltered': len(survivors), 'scored': 0, 'duplicates': 0}
+    candidates = []
+    if survivors:
+        try:
+            found = candidate_store.lookup(tag_ids, survivors)
+            # Questions indexed after the store's last refresh come straight from the database.
+            missing = [qid for qid in survivors if qid not in found]
+            if missing:
+                format_strings = ','.join(['%s'] * len(missing))
+                query = f"""
+                    SELECT q.id, q.title, q.question, qe.text_embedding, qe.image_embedding,
+                           qe.clean_title, qe.clean_question, qe.preprocess_version, qe.title_language, qe.question_language
+                    FROM questions q
+                    JOIN question_embeddings qe ON q.id = qe.question_id
+                    WHERE q.id IN ({format_strings})
+                """
+                for row in fetch_from_db(query, tuple(missing)):
+                    found[row['id']] = candidate_from_row(row)
+            candidates = [found[qid] for qid in survivors if qid in found]
 
-    except Exception as e:
-        return jsonify(success=False, message="Could not retrieve candidates."), 500
+        except Exception as e:
+            return jsonify(success=False, message="Could not retrieve candidates."), 500
 
     if not candidates:
-        return jsonify(success=True, message="No similar questions found for these tags.", duplicates=[])
-
-    potential_duplicates = []
-    for candidate in candidates:
-        q2_text_emb = np.frombuffer(candidate['text_embedding'], dtype=np.float32) if candidate['text_embedding'] else None
-        q2_img_emb = np.frombuffer(candidate['image_embedding'], dtype=np.float32) if candidate['image_embedding'] else None
-
-        if q2_text_emb is None: 
+        return jsonify(success=True, message="No similar questions found for these tags.", duplicates=[], stages=stages)
+
+    # Stage 2: full features and the classifier for the survivors only.
+    # The query and any candidates without current stored text go through the NLP pipeline in one batch.
+    candidate_preprocessed = [candidate['preprocessed'] for candidate in candidates]
+    stale = [i for i, clean in enumerate(candidate_preprocessed) if clean is None]
+    fresh = preprocess_questions(
+        [(title, question_text)] + [(candidates[i].get('title', ''), candidates[i].get('question', '')) for i in stale],
+        nlp_en, stemmer_id, stopword_remover_id, n_process=1,
+        languages=[None] + [candidates[i]['languages'] for i in stale]
+    )
+    q1_preprocessed = fresh[0]
+    for i, clean in zip(stale, fresh[1:]):
+        candidate_preprocessed[i] = clean
+    scored_candidates, scored_preprocessed = [], []
+    for candidate, q2_preprocessed in zip(candidates, candidate_preprocessed):
+        if candidate['text_emb'] is None: 
             print(f"WARNING: Candidate {candidate.get('id')} has no text embedding. Skipping feature creation.")
             continue
+        scored_candidates.append(candidate)
+        scored_preprocessed.append(q2_preprocessed)
+
+    stages['scored'] = len(scored_candidates)
+    if not scored_candidates:
+        return jsonify(success=True, message="No similar questions found for these tags.", duplicates=[], stages=stages)
+
+    # Features for every candidate in one vectorized pass, then one prediction call.
+    query = PreparedQuestions([question_text], [q1_preprocessed], [q1_text_emb], [q1_img_emb])
+    prepared = PreparedQuestions(
+        [c['question'] for c in scored_candidates], scored_preprocessed,
+        [c['text_emb'] for c in scored_candidates], [c['img_emb'] for c in scored_candidates]
+    )
+    feature_matrix = align_feature_matrix(build_feature_matrix(query, prepared), model.feature_names)
+    probabilities = model.predict(feature_matrix)
 
-        features_dict = create_features_from_embeddings(
-            title, question_text, q1_text_emb, q1_img_emb,
-            candidate.get('title', ''), candidate.get('question', ''), q2_text_emb, q2_img_emb,
-            nlp_en=nlp_en, stemmer_id=stemmer_id, stopword_remover_id=stopword_remover_id
-        )
-
-        expected_features_order = duplicate_classifier_model.feature_names_in_
-
-        feature_values = [features_dict.get(col, 0.0) for col in expected_features_order]
-        features_df = pd.DataFrame([feature_values], columns=expected_features_order)
-
-        probability = duplicate_classifier_model.predict_proba(features_df)[:, 1][0] 
-        print(f"DEBUG: Candidate ID {candidate.get('id')} (Title: '{candidate.get('title', '')}'): Probability = {round(float(probability), 4)}")
+    potential_duplicates = []
+    for candidate, probability in zip(scored_candidates, probabilities):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Candidate ID %s (Title: '%s'): Probability = %.4f", candidate.get('id'), candidate.get('title', ''), probability)
 
         if probability > 0.5:
             potential_duplicates.append({
@@ -969,12 +1812,23 @@ def find_similar_by_tags():
             })
 
     potential_duplicates.sort(key=lambda x: x['duplication_probability'], reverse=True)
-    return jsonify(success=True, duplicates=potential_duplicates)
+    stages['duplicates'] = len(potential_duplicates)
+    logger.debug("Duplicate check stages: %s", stages)
+    return jsonify(success=True, duplicates=potential_duplicates, stages=stages)
+
+RETRAIN_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'retrain_model.py')
+retrain_process = None
 
 def schedule_retrain_task():
     def schedule_retrain():
-        thread = threading.Thread(target=safe_model_retrain)
-        thread.start()
+        # Retraining runs in its own process with its own thread, nice and memory limits (see
+        # retrain_model.py), so it never competes with request handling for the GIL or the CPU.
+        global retrain_process
+        if retrain_process is not None and retrain_process.poll() is None:
+            print("Previous retraining run is still in progress. Skipping.")
+            return
+        retrain_process = subprocess.Popen([sys.executable, RETRAIN_SCRIPT])
+        print(f"Started retraining process {retrain_process.pid}.")
 
     scheduler = BackgroundScheduler()
     scheduler.add_job(schedule_retrain, 'interval', days=1, id='daily_retrain')
@@ -985,16 +1839,27 @@ if __name__ == '__main__':
     app.register_blueprint(face_bp)
     app.register_blueprint(duplicate_bp)
     
-    build_user_views_from_db()
-    build_graph_from_db()
-    build_leaderboard_from_db()
-    update_tag_model()
-
-    threading.Thread(target=periodic_data_refresh, args=(2,), daemon=True).start()
-    threading.Thread(target=monitor_recommendation_db, args=(2,), daemon=True).start()
-    threading.Thread(target=monitor_leaderboard_db, args=(2,), daemon=True).start()
-    threading.Thread(target=monitor_tag_model_db, args=(300,), daemon=True).start()
-    
-    load_model_if_needed()
+    # Nothing below blocks: the cheap endpoints serve right away and the rest report 503 until warm.
+    start_poller(user_views_resource, periodic_data_refresh, 2)
+    start_poller(follow_graph_resource, monitor_recommendation_db, 2)
+    start_poller(leaderboard_resource, monitor_leaderboard_db, 2)
+    start_poller(question_index_resource, monitor_question_index, QUESTION_INDEX_REFRESH_INTERVAL)
+    threading.Thread(
+        target=monitor_candidate_store, args=(CANDIDATE_STORE_REFRESH_INTERVAL,), name='candidate-store', daemon=True
+    ).start()
+    embedding_jobs.start()
+
+    def warm_up_models():
+        # Models load one after another so they don't fight over the CPU. The tag model needs the
+        # text model for seed embeddings, so its poller starts as soon as that one is loaded.
+        text_model_resource.warm_up()
+        start_poller(tag_prototypes_resource, monitor_tag_model_db, 300)
+        start_poller(tag_feedback_resource, flush_tag_feedback_periodically, TAG_FEEDBACK_FLUSH_INTERVAL)
+        for resource in (image_model_resource, nlp_models_resource):
+            resource.warm_up()
+        start_poller(duplicate_classifier_resource, watch_duplicate_model, MODEL_WATCH_INTERVAL)
+        if os.getenv('WARM_UP_FACE_MODEL', 'true').lower() == 'true':
+            face_model_resource.warm_up()
+    threading.Thread(target=warm_up_models, name='warm-up', daemon=True).start()
     schedule_retrain_task()
     app.run(debug=True, host='0.0.0.0', use_reloader=False)
\ No newline at end of file
@@ -0,0 +1,179 @@
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import mysql.connector
+import torch
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DEFAULT_STATE_FILE = 'backfill_embeddings.state'
+
+
+def db_connect():
+    return mysql.connector.connect(
+        host=os.getenv('DB_HOST', '127.0.0.1'),
+        user=os.getenv('DB_USERNAME', 'root'),
+        password=os.getenv('DB_PASSWORD', ''),
+        database=os.getenv('DB_DATABASE', 'uiux_project'),
+        port=os.getenv('DB_PORT', 3306)
+    )
+
+
+def init_image_worker():
+    # Each worker runs its own single-threaded forward passes; parallelism comes from the pool.
+    os.environ['TORCH_NUM_THREADS'] = '1'
+    torch.set_num_threads(1)
+
+
+def embed_image_paths(relative_paths):
+    from embeddings import compute_image_embeddings, question_image_path
+    full_paths = [question_image_path(path) for path in relative_paths]
+    found = [i for i, path in enumerate(full_paths) if path]
+    results = [None] * len(relative_paths)
+    for i, img_emb in zip(found, compute_image_embeddings(full_paths[i] for i in found)):
+        results[i] = img_emb
+    return results
+
+
+def read_resume_id(state_file):
+    if not os.path.exists(state_file):
+        return ''
+    with open(state_file) as f:
+        return f.read().strip()
+
+
+def write_resume_id(state_file, question_id):
+    tmp_path = state_file + '.tmp'
+    with open(tmp_path, 'w') as f:
+        f.write(question_id)
+    os.replace(tmp_path, state_file)
+
+
+def stream_questions(conn, after_id, force, fetch_size, limit=None):
+    """Yields lists of question rows ordered by id, streamed from an unbuffered (server-side) cursor."""
+    query = "SELECT q.id, q.title, q.question, q.image FROM questions q"
+    if not force:
+        query += " LEFT JOIN question_embeddings qe ON qe.question_id = q.id"
+    query += " WHERE q.id > %s"
+    if not force:
+        query += " AND qe.question_id IS NULL"
+    query += " ORDER BY q.id"
+    params = (after_id,)
+    if limit is not None:
+        query += " LIMIT %s"
+        params += (limit,)
+
+    cur = conn.cursor(dictionary=True, buffered=False)
+    # The server stalls on a slow reader while we encode, so don't let it give up on us.
+    cur.execute("SET SESSION net_write_timeout = 3600")
+    cur.execute(query, params)
+    try:
+        while True:
+            rows = cur.fetchmany(fetch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        cur.close()
+
+
+def backfill(force=False, batch_size=64, chunk_size=512, image_workers=2, resume=False, state_file=DEFAULT_STATE_FILE, limit=None):
+    from embeddings import QUESTION_EMBEDDING_UPSERT, compute_text_embeddings, encode_image_embedding, encode_text_embedding
+    from shared_features import load_nlp_models, preprocess_for_storage
+
+    nlp_models = load_nlp_models()
+
+    after_id = read_resume_id(state_file) if resume else ''
+    if after_id:
+        print(f"Resuming after question id {after_id}.")
+
+    read_conn, write_conn = db_connect(), db_connect()
+    write_cur = write_conn.cursor()
+    image_pool = None
+    if image_workers > 0:
+        # Forking after torch has started its thread pool can deadlock the children, so spawn them.
+        image_pool = ProcessPoolExecutor(
+            max_workers=image_workers, initializer=init_image_worker, mp_context=multiprocessing.get_context('spawn')
+        )
+
+    started_at = time.time()
+    processed = images = 0
+    pending_rows = []
+
+    def flush():
+        nonlocal pending_rows
+        if not pending_rows:
+            return
+        write_cur.executemany(QUESTION_EMBEDDING_UPSERT, pending_rows)
+        write_conn.commit()
+        write_resume_id(state_file, pending_rows[-1][0])
+        pending_rows = []
+        elapsed = max(time.time() - started_at, 1e-9)
+        print(f"  {processed} questions ({images} images) in {elapsed:.1f}s - {processed / elapsed:.1f} questions/s")
+
+    try:
+        for rows in stream_questions(read_conn, after_id, force, batch_size, limit):
+            txt_embs = compute_text_embeddings(
+                [(row['title'] or '') + ' ' + (row['question'] or '') for row in rows], use_cache=False
+            )
+            image_paths = [row['image'] for row in rows]
+            with_image = [i for i, path in enumerate(image_paths) if path]
+            img_embs = [None] * len(rows)
+            if with_image:
+                paths = [image_paths[i] for i in with_image]
+                if image_pool:
+                    # One sub-batch per worker so each process still gets a batched forward pass.
+                    step = -(-len(paths) // image_workers)
+                    shards = image_pool.map(embed_image_paths, [paths[s:s + step] for s in range(0, len(paths), step)])
+                    results = [img_emb for shard in shards for img_emb in shard]
+                else:
+                    results = embed_image_paths(paths)
+                for i, img_emb in zip(with_image, results):
+                    img_embs[i] = img_emb
+                    images += img_emb is not None
+
+            preprocessed = preprocess_for_storage([(row['title'] or '', row['question'] or '') for row in rows], *nlp_models)
+            for row, txt_emb, img_emb, clean in zip(rows, txt_embs, img_embs, preprocessed):
+                pending_rows.append((row['id'], encode_text_embedding(txt_emb), encode_image_embedding(img_emb)) + clean)
+            processed += len(rows)
+            if len(pending_rows) >= chunk_size:
+                flush()
+        flush()
+    finally:
+        if image_pool:
+            image_pool.shutdown()
+        write_cur.close()
+        write_conn.close()
+        read_conn.close()
+
+    elapsed = max(time.time() - started_at, 1e-9)
+    print("--- Embedding Backfill Finished ---")
+    print(f"Questions embedded: {processed}")
+    print(f"Images embedded:    {images}")
+    print(f"Elapsed:            {elapsed:.1f}s")
+    print(f"Throughput:         {processed / elapsed:.1f} questions/s")
+    return processed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or rebuild question_embeddings for the whole corpus.")
+    parser.add_argument('--force', action='store_true', help="re-embed every question, not just those without embeddings")
+    parser.add_argument('--batch-size', type=int, default=64, help="questions encoded per model call")
+    parser.add_argument('--chunk-size', type=int, default=512, help="rows per upsert/commit")
+    parser.add_argument('--image-workers', type=int, default=2, help="processes used for image embeddings (0 = inline)")
+    parser.add_argument('--resume', action='store_true', help="continue after the last committed question id")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_FILE, help="where the last committed question id is kept")
+    parser.add_argument('--limit', type=int, default=None, help="stop after this many questions")
+    args = parser.parse_args()
+
+    backfill(
+        force=args.force, batch_size=args.batch_size, chunk_size=args.chunk_size, image_workers=args.image_workers,
+        resume=args.resume, state_file=args.state_file, limit=args.limit
+    )
+
+
+if __name__ == '__main__':
+    main()
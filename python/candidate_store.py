@@ -0,0 +1,251 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+class TagCandidates:
+    """
+    Every embedded question of one tag. Embeddings sit in contiguous matrices (text float32, image
+    float16) with one row per question; the text fields needed for features sit in a parallel list.
+    """
+
+    def __init__(self):
+        self.ids = []
+        self.row_of = {}
+        self.text = None
+        self.image = None
+        self.has_image = np.zeros(0, dtype=bool)
+        self.fields = []
+        self.field_bytes = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    @property
+    def nbytes(self):
+        matrices = sum(m.nbytes for m in (self.text, self.image, self.has_image) if m is not None)
+        return matrices + self.field_bytes
+
+    @staticmethod
+    def _fields_size(fields):
+        return sum(len(value) for value in fields if isinstance(value, str)) + 64 * len(fields)
+
+    def upsert(self, candidates):
+        """Adds or replaces candidates; each is a dict with id, text_emb, img_emb and the text fields."""
+        candidates = [c for c in candidates if c['text_emb'] is not None]
+        if not candidates:
+            return
+        new = [c for c in candidates if c['id'] not in self.row_of]
+        if new:
+            start = len(self.ids)
+            text_dim = len(new[0]['text_emb'])
+            grown_text = np.zeros((start + len(new), text_dim), dtype=np.float32)
+            if self.text is not None:
+                grown_text[:start] = self.text
+            self.text = grown_text
+            if self.image is not None:
+                self.image = np.vstack([self.image, np.zeros((len(new), self.image.shape[1]), dtype=np.float16)])
+            self.has_image = np.concatenate([self.has_image, np.zeros(len(new), dtype=bool)])
+            for offset, c in enumerate(new):
+                self.row_of[c['id']] = start + offset
+                self.ids.append(c['id'])
+                self.fields.append(())
+
+        for c in candidates:
+            row = self.row_of[c['id']]
+            self.text[row] = c['text_emb']
+            img_emb = c['img_emb']
+            if img_emb is not None:
+                if self.image is None:
+                    self.image = np.zeros((len(self.ids), len(img_emb)), dtype=np.float16)
+                self.image[row] = img_emb
+            self.has_image[row] = img_emb is not None
+            fields = (c['title'], c['question'], c['preprocessed'], c['languages'])
+            self.field_bytes += self._fields_size(fields) - self._fields_size(self.fields[row])
+            self.fields[row] = fields
+
+    def remove(self, question_id):
+        """Drops a question; the last row moves into its place so the matrices stay dense."""
+        row = self.row_of.pop(question_id, None)
+        if row is None:
+            return False
+        last = len(self.ids) - 1
+        self.field_bytes -= self._fields_size(self.fields[row])
+        if row != last:
+            moved_id = self.ids[last]
+            self.ids[row] = moved_id
+            self.row_of[moved_id] = row
+            self.fields[row] = self.fields[last]
+            self.text[row] = self.text[last]
+            if self.image is not None:
+                self.image[row] = self.image[last]
+            self.has_image[row] = self.has_image[last]
+        self.ids.pop()
+        self.fields.pop()
+        self.text = self.text[:last]
+        if self.image is not None:
+            self.image = self.image[:last]
+        self.has_image = self.has_image[:last]
+        return True
+
+    def candidate(self, question_id):
+        row = self.row_of.get(question_id)
+        if row is None:
+            return None
+        title, question, preprocessed, languages = self.fields[row]
+        return {
+            'id': question_id, 'title': title, 'question': question,
+            'text_emb': self.text[row],
+            'img_emb': self.image[row].astype(np.float32) if self.has_image[row] else None,
+            'preprocessed': preprocessed, 'languages': languages
+        }
+
+
+class CandidateStore:
+    """
+    Resident per-tag candidate data for duplicate detection, loaded on first use of a tag.
+    Tags are kept in least-recently-used order and the coldest are evicted once their combined size
+    exceeds `max_bytes`. `loader(tag_id)` returns (watermark, candidates) read from the database.
+    """
+
+    def __init__(self, loader, max_bytes):
+        self.loader = loader
+        self.max_bytes = max_bytes
+        self.tags = OrderedDict()
+        self.total_bytes = 0
+        self.loads = 0
+        self.evictions = 0
+        self._catch_up_since = None
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _evict(self, keep):
+        while self.total_bytes > self.max_bytes and len(self.tags) > 1:
+            tag_id = next(iter(self.tags))
+            if tag_id == keep:
+                self.tags.move_to_end(tag_id)
+                continue
+            self.total_bytes -= self.tags.pop(tag_id).nbytes
+            self.evictions += 1
+
+    def _cached(self, tag_id):
+        with self._lock:
+            entry = self.tags.get(tag_id)
+            if entry is not None:
+                self.tags.move_to_end(tag_id)
+            return entry
+
+    def get_tag(self, tag_id):
+        entry = self._cached(tag_id)
+        if entry is not None:
+            return entry
+        # One load per cold tag: concurrent requests for it wait on its lock, then find it loaded.
+        # Other tags stay readable because the store lock is not held during the load.
+        with self._lock:
+            load_lock = self._load_locks.setdefault(tag_id, threading.Lock())
+        with load_lock:
+            try:
+                entry = self._cached(tag_id)
+                if entry is not None:
+                    return entry
+                watermark, candidates = self.loader(tag_id)
+                entry = TagCandidates()
+                entry.upsert(candidates)
+                self._store(tag_id, entry, watermark)
+            finally:
+                with self._lock:
+                    self._load_locks.pop(tag_id, None)
+        return entry
+
+    def _store(self, tag_id, entry, watermark):
+        with self._lock:
+            previous = self.tags.pop(tag_id, None)
+            if previous is not None:
+                self.total_bytes -= previous.nbytes
+            self.tags[tag_id] = entry
+            self.total_bytes += entry.nbytes
+            self.loads += 1
+            # Changes between this load's snapshot and the refresh watermark must still be replayed.
+            if self._catch_up_since is None or watermark < self._catch_up_since:
+                self._catch_up_since = watermark
+            self._evict(keep=tag_id)
+
+    def lookup(self, tag_ids, question_ids):
+        """Returns {question id: candidate} for the given questions found in any of the tags."""
+        wanted = set(question_ids)
+        found = {}
+        for tag_id in tag_ids:
+            entry = self.get_tag(tag_id)
+            with self._lock:
+                for question_id in wanted - found.keys():
+                    candidate = entry.candidate(question_id)
+                    if candidate is not None:
+                        found[question_id] = candidate
+            if len(found) == len(wanted):
+                break
+        return found
+
+    def loaded_tags(self):
+        with self._lock:
+            return list(self.tags)
+
+    def refresh_since(self, watermark):
+        """The point a refresh must read changes from: the watermark, or earlier if a load started before it."""
+        with self._lock:
+            since, self._catch_up_since = self._catch_up_since, None
+        if watermark is None:
+            return since
+        return watermark if since is None else min(since, watermark)
+
+    def apply_updates(self, candidates_by_tag):
+        with self._lock:
+            for tag_id, candidates in candidates_by_tag.items():
+                entry = self.tags.get(tag_id)
+                if entry is None:
+                    continue
+                self.total_bytes -= entry.nbytes
+                entry.upsert(candidates)
+                self.total_bytes += entry.nbytes
+            self._evict(keep=None)
+
+    def _remove_where(self, should_remove):
+        with self._lock:
+            removed = 0
+            for tag_id, entry in self.tags.items():
+                self.total_bytes -= entry.nbytes
+                for question_id in [qid for qid in entry.ids if should_remove(tag_id, qid)]:
+                    removed += entry.remove(question_id)
+                self.total_bytes += entry.nbytes
+            return removed
+
+    def remove_questions(self, question_ids):
+        """Drops deleted questions from every loaded tag."""
+        question_ids = set(question_ids)
+        if not question_ids:
+            return 0
+        return self._remove_where(lambda tag_id, qid: qid in question_ids)
+
+    def set_memberships(self, tags_by_question):
+        """Drops each given question (question id -> its current tag ids) from loaded tags it no longer has."""
+        tags_by_question = {qid: set(tag_ids) for qid, tag_ids in tags_by_question.items()}
+        if not tags_by_question:
+            return 0
+        return self._remove_where(
+            lambda tag_id, qid: qid in tags_by_question and tag_id not in tags_by_question[qid]
+        )
+
+    def clear(self):
+        with self._lock:
+            self.tags.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tags': len(self.tags),
+                'questions': sum(len(entry) for entry in self.tags.values()),
+                'bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
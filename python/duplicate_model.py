@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import numpy as np
+
+# The classifier is saved as a native XGBoost booster plus a JSON sidecar holding the feature order
+# and the booster's sha256. The sidecar is written last, so a booster whose checksum doesn't match
+# is a save in progress and is not loaded. The old joblib pickle is still read if no booster exists.
+BOOSTER_PATH = os.getenv('DUPLICATE_MODEL_PATH', 'duplicate_classifier_model.ubj')
+SCHEMA_PATH = os.path.splitext(BOOSTER_PATH)[0] + '.schema.json'
+LEGACY_MODEL_PATH = 'duplicate_classifier_model.pkl'
+
+
+class ModelArtifactError(RuntimeError):
+    pass
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def artifact_signature():
+    """Changes whenever any of the model files is replaced; cheap enough to poll."""
+    signature = []
+    for path in (BOOSTER_PATH, SCHEMA_PATH, LEGACY_MODEL_PATH):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+class DuplicateModel:
+    """A loaded classifier and the feature order it expects; predict() returns P(duplicate) per row."""
+
+    def __init__(self, feature_names, booster=None, legacy_model=None, source=None, metadata=None):
+        self.feature_names = list(feature_names)
+        self.booster = booster
+        self.legacy_model = legacy_model
+        self.source = source
+        self.metadata = metadata or {}
+
+    def predict(self, feature_matrix):
+        feature_matrix = np.ascontiguousarray(feature_matrix, dtype=np.float32)
+        if self.booster is not None:
+            # binary:logistic boosters return the positive-class probability directly.
+            return self.booster.inplace_predict(feature_matrix, validate_features=False)
+        import pandas as pd
+        features_df = pd.DataFrame(feature_matrix, columns=self.feature_names, copy=False)
+        return self.legacy_model.predict_proba(features_df)[:, 1]
+
+    def validate(self):
+        probabilities = np.asarray(self.predict(np.zeros((2, len(self.feature_names)), dtype=np.float32)))
+        if probabilities.shape != (2,) or not np.all(np.isfinite(probabilities)):
+            raise ModelArtifactError(f"Model from {self.source} returned {probabilities!r} for a test batch.")
+        return self
+
+
+def load_booster_model():
+    import xgboost as xgb
+    with open(SCHEMA_PATH) as f:
+        schema = json.load(f)
+    if schema.get('sha256') != file_sha256(BOOSTER_PATH):
+        raise ModelArtifactError(f"{BOOSTER_PATH} does not match {SCHEMA_PATH} (save in progress?).")
+    booster = xgb.Booster()
+    booster.load_model(BOOSTER_PATH)
+    booster.set_param({'nthread': int(os.getenv('DUPLICATE_MODEL_THREADS', 1))})
+    feature_names = schema['feature_names']
+    if booster.num_features() != len(feature_names):
+        raise ModelArtifactError(f"Booster has {booster.num_features()} features, schema lists {len(feature_names)}.")
+    return DuplicateModel(feature_names, booster=booster, source=BOOSTER_PATH, metadata=schema).validate()
+
+
+def load_legacy_model():
+    import joblib
+    legacy_model = joblib.load(LEGACY_MODEL_PATH)
+    return DuplicateModel(legacy_model.feature_names_in_, legacy_model=legacy_model, source=LEGACY_MODEL_PATH).validate()
+
+
+def load_duplicate_model():
+    """Loads and validates the current artifact: the booster if present, else the legacy pickle."""
+    if os.path.exists(BOOSTER_PATH) or os.path.exists(SCHEMA_PATH):
+        return load_booster_model()
+    if os.path.exists(LEGACY_MODEL_PATH):
+        return load_legacy_model()
+    raise ModelArtifactError(f"No duplicate detection model found at {BOOSTER_PATH} or {LEGACY_MODEL_PATH}.")
+
+
+def save_duplicate_model(model, feature_names, booster_path=BOOSTER_PATH, schema_path=SCHEMA_PATH, **metadata):
+    """Writes a fitted XGBClassifier as booster + sidecar schema, each via a temporary file and os.replace."""
+    temp_booster = booster_path + '.tmp' + os.path.splitext(booster_path)[1]
+    model.get_booster().save_model(temp_booster)
+    schema = dict(metadata, feature_names=list(feature_names), sha256=file_sha256(temp_booster))
+    temp_schema = schema_path + '.tmp'
+    with open(temp_schema, 'w') as f:
+        json.dump(schema, f, indent=2)
+    os.replace(temp_booster, booster_path)
+    os.replace(temp_schema, schema_path)
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import numpy as np
+
+
+def normalize_cache_text(text: str) -> str:
+    if not isinstance(text, str): return ""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed cache for embedding vectors.
+
+    Vectors live in a fixed-size float32 memory-mapped file with one slot per entry. A SQLite index
+    maps sha256(model name + normalized text) to a slot and its last-use time, so several worker
+    processes can share the same cache directory. When all slots are taken the least recently used
+    entry is evicted.
+
+    Reads take no SQLite write lock. Each slot also records the first 16 bytes of its key in a second
+    memory-mapped file; writers clear it before overwriting a vector and set it afterwards, and readers
+    only accept a vector whose slot names their key both before and after the copy. Last-use times are
+    buffered and written in batches every RECENCY_FLUSH_SECONDS.
+    """
+
+    KEY_BYTES = 16
+    RECENCY_FLUSH_SECONDS = 30
+
+    def __init__(self, directory, model_name, dim, capacity=50000):
+        self.model_name = model_name
+        self.dim = dim
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._touched_flushed_at = time.time()
+
+        os.makedirs(directory, exist_ok=True)
+        safe_model = re.sub(r'[^A-Za-z0-9_.-]', '_', model_name)
+        vectors_path = os.path.join(directory, f"{safe_model}.{dim}.f32")
+        keys_path = os.path.join(directory, f"{safe_model}.{dim}.keys")
+        index_path = os.path.join(directory, f"{safe_model}.{dim}.sqlite")
+
+        created = self._create_file(vectors_path, capacity * dim * 4)
+        self._create_file(keys_path, capacity * self.KEY_BYTES)
+        for path, row_bytes in ((vectors_path, dim * 4), (keys_path, self.KEY_BYTES)):
+            existing = os.path.getsize(path) // row_bytes
+            if existing != capacity:
+                # The files are shared with other running processes, so they are never rebuilt here.
+                raise ValueError(
+                    f"Embedding cache {path} holds {existing} entries but capacity {capacity} was requested; "
+                    f"set EMBEDDING_CACHE_CAPACITY={existing} or use another EMBEDDING_CACHE_DIR."
+                )
+        self._vectors = np.memmap(vectors_path, dtype=np.float32, mode='r+', shape=(capacity, dim))
+        self._keys = np.memmap(keys_path, dtype=np.uint8, mode='r+', shape=(capacity, self.KEY_BYTES))
+
+        self._db = sqlite3.connect(index_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, slot INTEGER UNIQUE NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used)")
+        if created:
+            # A fresh vector file invalidates whatever the index pointed at.
+            self._db.execute("DELETE FROM entries")
+
+    @staticmethod
+    def _create_file(path, size):
+        """Creates a zero-filled file unless it exists; returns True if this call created it."""
+        try:
+            with open(path, 'xb') as f:
+                f.truncate(size)
+            return True
+        except FileExistsError:
+            return False
+
+    def _key_bytes(self, key):
+        return np.frombuffer(bytes.fromhex(key)[:self.KEY_BYTES], dtype=np.uint8)
+
+    def _read_slot(self, key, slot):
+        """Copies a slot's vector if the slot still belongs to key before and after the copy."""
+        expected = self._key_bytes(key)
+        if not np.array_equal(self._keys[slot], expected):
+            return None
+        vector = np.array(self._vectors[slot])
+        if not np.array_equal(self._keys[slot], expected):
+            return None
+        return vector
+
+    def _flush_recency(self, force=False):
+        """Writes buffered last-use times (call with _lock held, outside any transaction)."""
+        if not self._touched or (not force and time.time() - self._touched_flushed_at < self.RECENCY_FLUSH_SECONDS):
+            return
+        touched, self._touched = self._touched, {}
+        self._touched_flushed_at = time.time()
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            self._db.executemany("UPDATE entries SET last_used = ? WHERE key = ?", [(t, k) for k, t in touched.items()])
+            self._db.execute("COMMIT")
+        except Exception:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def key_for(self, text: str) -> str:
+        payload = f"{self.model_name}\0{normalize_cache_text(text)}".encode('utf-8')
+        return hashlib.sha256(payload).hexdigest()
+
+    def get_many(self, texts):
+        """Returns a list aligned with texts holding cached vectors, or None for misses."""
+        keys = [self.key_for(text) for text in texts]
+        results = [None] * len(texts)
+        with self._lock:
+            slots = {}
+            unique_keys = list(dict.fromkeys(keys))
+            for start in range(0, len(unique_keys), 500):
+                chunk = unique_keys[start:start + 500]
+                format_strings = ','.join(['?'] * len(chunk))
+                for key, slot in self._db.execute(
+                    f"SELECT key, slot FROM entries WHERE key IN ({format_strings})", chunk
+                ):
+                    slots[key] = slot
+            vectors = {}
+            for key, slot in slots.items():
+                vector = self._read_slot(key, slot)
+                if vector is not None:
+                    vectors[key] = vector
+            now = time.time()
+            returned = set()
+            for i, key in enumerate(keys):
+                vector = vectors.get(key)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._touched[key] = now
+                    # Repeated texts get their own copy so callers can't alias each other's results.
+                    results[i] = vector.copy() if key in returned else vector
+                    returned.add(key)
+            self._flush_recency()
+        return results
+
+    def get(self, text: str):
+        return self.get_many([text])[0]
+
+    def put_many(self, texts, vectors):
+        entries = {}
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            if vector.shape != (self.dim,):
+                continue
+            entries[self.key_for(text)] = vector
+        if not entries:
+            return
+        with self._lock:
+            # Pending recency goes in first so eviction sees which entries are actually in use.
+            self._flush_recency(force=True)
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for key, vector in entries.items():
+                    row = self._db.execute("SELECT slot FROM entries WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        slot = row[0]
+                    else:
+                        slot = self._free_slot()
+                    self._keys[slot] = 0
+                    self._vectors[slot] = vector
+                    self._keys[slot] = self._key_bytes(key)
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO entries (key, slot, last_used) VALUES (?, ?, ?)", (key, slot, time.time())
+                    )
+                # Vectors must be on disk before other processes can see the index rows that point at them.
+                self._vectors.flush()
+                self._keys.flush()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def put(self, text: str, vector):
+        self.put_many([text], [vector])
+
+    def _free_slot(self) -> int:
+        # Entries are only removed by eviction, which hands its slot straight to the new entry,
+        # so occupied slots are always 0..used-1.
+        (used,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+        if used < self.capacity:
+            return used
+        key, slot = self._db.execute("SELECT key, slot FROM entries ORDER BY last_used ASC LIMIT 1").fetchone()
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self.evictions += 1
+        return slot
+
+    def stats(self):
+        with self._lock:
+            (size,) = self._db.execute("SELECT COUNT(*) FROM entries").fetchone()
+            lookups = self.hits + self.misses
+            return {
+                "model": self.model_name,
+                "entries": size,
+                "capacity": self.capacity,
+                "bytes": int(size * self.dim * 4),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,76 @@
+import os
+import struct
+import numpy as np
+
+# Versioned BLOB layout for question_embeddings:
+#   magic (4) | version (1) | dtype code (1) | model id length (1) | reserved (1) | dim (uint32 LE)
+#   | model id (ascii) | scale (float32 LE, int8 only) | payload
+# Rows written before this format are bare float32 bytes and are still decoded as such.
+MAGIC = b'\x93EMB'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBI')
+SCALE = struct.Struct('<f')
+
+DTYPE_CODES = {'float32': 0, 'float16': 1, 'int8': 2}
+CODE_DTYPES = {code: name for name, code in DTYPE_CODES.items()}
+
+TEXT_EMBEDDING_STORAGE_DTYPE = os.getenv('TEXT_EMBEDDING_STORAGE_DTYPE', 'float16')
+IMAGE_EMBEDDING_STORAGE_DTYPE = os.getenv('IMAGE_EMBEDDING_STORAGE_DTYPE', 'int8')
+
+
+class EmbeddingFormatError(ValueError):
+    pass
+
+
+def encode_embedding(vector, dtype='float16', model_id='') -> bytes:
+    if dtype not in DTYPE_CODES:
+        raise EmbeddingFormatError(f"Unsupported embedding storage dtype '{dtype}'.")
+    vector = np.asarray(vector, dtype=np.float32).ravel()
+    model_bytes = model_id.encode('ascii')[:255]
+    header = HEADER.pack(MAGIC, VERSION, DTYPE_CODES[dtype], len(model_bytes), 0, vector.shape[0]) + model_bytes
+
+    if dtype == 'float32':
+        return header + vector.astype('<f4').tobytes()
+    if dtype == 'float16':
+        return header + vector.astype('<f2').tobytes()
+    max_abs = float(np.max(np.abs(vector))) if vector.size else 0.0
+    scale = max_abs / 127.0 if max_abs > 0 else 1.0
+    quantized = np.clip(np.rint(vector / scale), -127, 127).astype(np.int8)
+    return header + SCALE.pack(scale) + quantized.tobytes()
+
+
+def read_header(blob):
+    """Returns (dtype, dim, model_id, payload_offset) for a versioned blob, or None for legacy float32 bytes."""
+    if len(blob) < HEADER.size or bytes(blob[:4]) != MAGIC:
+        return None
+    magic, version, dtype_code, model_len, _, dim = HEADER.unpack_from(blob)
+    dtype = CODE_DTYPES.get(dtype_code)
+    if version != VERSION or dtype is None:
+        return None
+    offset = HEADER.size + model_len
+    model_id = bytes(blob[HEADER.size:offset]).decode('ascii', errors='replace')
+    if dtype == 'int8':
+        offset += SCALE.size
+    item_size = {'float32': 4, 'float16': 2, 'int8': 1}[dtype]
+    # A legacy vector could start with the magic bytes by chance; the sizes must also line up.
+    if len(blob) != offset + dim * item_size:
+        return None
+    return dtype, dim, model_id, offset
+
+
+def decode_embedding(blob):
+    """Decodes a stored embedding (versioned or legacy) to a float32 vector; None/empty gives None."""
+    if not blob:
+        return None
+    header = read_header(blob)
+    if header is None:
+        if len(blob) % 4:
+            raise EmbeddingFormatError(f"Embedding blob of {len(blob)} bytes is neither versioned nor float32.")
+        return np.frombuffer(blob, dtype=np.float32)
+    dtype, dim, _, offset = header
+    if dtype == 'float32':
+        return np.frombuffer(blob, dtype='<f4', count=dim, offset=offset).astype(np.float32)
+    if dtype == 'float16':
+        return np.frombuffer(blob, dtype='<f2', count=dim, offset=offset).astype(np.float32)
+    (scale,) = SCALE.unpack_from(blob, offset - SCALE.size)
+    return np.frombuffer(blob, dtype=np.int8, count=dim, offset=offset).astype(np.float32) * np.float32(scale)
@@ -0,0 +1,163 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from PIL import Image
+from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache, normalize_cache_text
+from embedding_codec import IMAGE_EMBEDDING_STORAGE_DTYPE, TEXT_EMBEDDING_STORAGE_DTYPE, encode_embedding
+from lazy_resource import LazyResource
+from onnx_backend import backend_id, onnx_enabled, onnx_image_model, onnx_text_model
+
+load_dotenv()
+
+TEXT_ENCODE_BATCH_SIZE = int(os.getenv('TEXT_ENCODE_BATCH_SIZE', 64))
+IMAGE_SIZE = 224
+IMAGE_BATCH_SIZE = int(os.getenv('IMAGE_BATCH_SIZE', 16))
+IMAGE_DECODE_WORKERS = int(os.getenv('IMAGE_DECODE_WORKERS', 0))
+
+image_decode_pool = ThreadPoolExecutor(max_workers=IMAGE_DECODE_WORKERS) if IMAGE_DECODE_WORKERS > 0 else None
+
+TEXT_MODEL_NAME = 'paraphrase-multilingual-MiniLM-L12-v2'
+IMAGE_MODEL_ID = 'resnet50.IMAGENET1K_V2'
+text_embedding_cache = None
+
+# torch, sentence-transformers and torchvision take seconds to import, so they are only
+# imported by the loaders below, on first use or during background warm-up.
+def configure_torch():
+    import torch
+    if os.getenv('TORCH_NUM_THREADS'):
+        torch.set_num_threads(int(os.getenv('TORCH_NUM_THREADS')))
+    return torch
+
+def load_text_model():
+    global text_embedding_cache
+    configure_torch()
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(TEXT_MODEL_NAME)
+    if onnx_enabled():
+        model = onnx_text_model(model, TEXT_MODEL_NAME)
+    try:
+        # Vectors from torch, ONNX and quantized ONNX differ slightly, so each backend gets its own cache.
+        text_embedding_cache = EmbeddingCache(
+            os.getenv('EMBEDDING_CACHE_DIR', 'embedding_cache'),
+            f"{TEXT_MODEL_NAME}.{backend_id(model)}",
+            model.get_sentence_embedding_dimension(),
+            capacity=int(os.getenv('EMBEDDING_CACHE_CAPACITY', 50000))
+        )
+    except Exception as e:
+        print(f"ERROR opening text embedding cache, continuing without it: {e}")
+        text_embedding_cache = None
+    return model
+
+def load_image_model():
+    torch = configure_torch()
+    from torchvision import models, transforms
+    from torchvision.models import ResNet50_Weights
+    resnet = models.resnet50(weights=ResNet50_Weights.DEFAULT)
+    image_model = torch.nn.Sequential(*list(resnet.children())[:-1]).eval()
+    preprocess = transforms.Compose([
+        transforms.Resize((IMAGE_SIZE, IMAGE_SIZE)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485,0.456,0.406], std=[0.229,0.224,0.225])
+    ])
+    if onnx_enabled():
+        image_model = onnx_image_model(image_model, IMAGE_MODEL_ID, IMAGE_SIZE)
+    return image_model, preprocess
+
+text_model_resource = LazyResource('text_model', load_text_model)
+image_model_resource = LazyResource('image_model', load_image_model)
+
+def compute_text_embeddings(texts, use_cache=True) -> np.ndarray:
+    text_model = text_model_resource.get()
+    normalized = [normalize_cache_text(text) for text in texts]
+    if not normalized:
+        return np.zeros((0, text_model.get_sentence_embedding_dimension()), dtype=np.float32)
+    vectors = [None] * len(normalized)
+    cache = text_embedding_cache if use_cache else None
+    if cache is not None:
+        try:
+            vectors = cache.get_many(normalized)
+        except Exception as e:
+            print(f"Text embedding cache lookup failed: {e}")
+
+    missing = list(dict.fromkeys(text for text, vec in zip(normalized, vectors) if vec is None))
+    if missing:
+        encoded = dict(zip(missing, text_model.encode(missing, batch_size=TEXT_ENCODE_BATCH_SIZE)))
+        if cache is not None:
+            try:
+                cache.put_many(missing, [encoded[text] for text in missing])
+            except Exception as e:
+                print(f"Text embedding cache write failed: {e}")
+        vectors = [encoded[text] if vec is None else vec for text, vec in zip(normalized, vectors)]
+    return np.vstack(vectors).astype(np.float32)
+
+def compute_text_embedding(text: str) -> np.ndarray:
+    return compute_text_embeddings([text])[0]
+
+def load_image(image_source) -> Image.Image:
+    img = Image.open(image_source)
+    if img.format == 'JPEG':
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale while both sides stay at least IMAGE_SIZE;
+        # phone photos are then resized from a few hundred pixels instead of several thousand.
+        img.draft('RGB', (IMAGE_SIZE, IMAGE_SIZE))
+    return img.convert('RGB')
+
+def decode_image_tensor(image_source, preprocess):
+    try:
+        return preprocess(load_image(image_source))
+    except Exception as e:
+        print(f"Error decoding image: {e}")
+        return None
+
+def compute_image_embeddings(image_sources) -> list:
+    """Returns one embedding per source (None where decoding failed), running the model on stacked batches."""
+    import torch
+    image_model, preprocess = image_model_resource.get()
+    image_sources = list(image_sources)
+    if image_decode_pool is not None and len(image_sources) > 1:
+        tensors = list(image_decode_pool.map(lambda source: decode_image_tensor(source, preprocess), image_sources))
+    else:
+        tensors = [decode_image_tensor(source, preprocess) for source in image_sources]
+
+    results = [None] * len(image_sources)
+    decoded = [i for i, tensor in enumerate(tensors) if tensor is not None]
+    for start in range(0, len(decoded), IMAGE_BATCH_SIZE):
+        batch_idx = decoded[start:start + IMAGE_BATCH_SIZE]
+        try:
+            with torch.inference_mode():
+                feats = image_model(torch.stack([tensors[i] for i in batch_idx])).flatten(1).numpy()
+        except Exception as e:
+            print(f"Error computing image embeddings: {e}")
+            continue
+        for i, feat in zip(batch_idx, feats):
+            results[i] = feat
+    return results
+
+def compute_image_embedding(image_source) -> np.ndarray:
+    return compute_image_embeddings([image_source])[0]
+
+def encode_text_embedding(vector) -> bytes:
+    return encode_embedding(vector, TEXT_EMBEDDING_STORAGE_DTYPE, TEXT_MODEL_NAME)
+
+def encode_image_embedding(vector):
+    if vector is None:
+        return None
+    return encode_embedding(vector, IMAGE_EMBEDDING_STORAGE_DTYPE, IMAGE_MODEL_ID)
+
+def question_image_path(relative_path: str):
+    laravel_public_path = os.getenv('PUBLIC_PATH', '../public')
+    if not laravel_public_path or os.path.isabs(relative_path) or '..' in relative_path.replace('\\', '/').split('/'):
+        return None
+    return os.path.join(laravel_public_path, 'storage', relative_path)
+
+QUESTION_EMBEDDING_UPSERT = """
+    INSERT INTO question_embeddings (
+        question_id, text_embedding, image_embedding, clean_title, clean_question, preprocess_version,
+        title_language, question_language, created_at, updated_at
+    )
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW()) ON DUPLICATE KEY UPDATE
+    text_embedding = VALUES(text_embedding), image_embedding = VALUES(image_embedding),
+    clean_title = VALUES(clean_title), clean_question = VALUES(clean_question),
+    preprocess_version = VALUES(preprocess_version), title_language = VALUES(title_language),
+    question_language = VALUES(question_language), updated_at = NOW()
+"""
@@ -0,0 +1,57 @@
+import hashlib
+import os
+import numpy as np
+from shared_features import FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, PREPROCESS_VERSION
+
+FEATURE_CACHE_PATH = os.getenv('RETRAIN_FEATURE_CACHE', 'retrain_feature_cache.npz')
+
+
+def question_version(title, question, embedding_updated_at):
+    """
+    Changes when a question's text or stored embeddings change. questions.updated_at is not used:
+    views and votes bump it without changing anything the features read.
+    """
+    digest = hashlib.blake2b(f"{title}\0{question}".encode('utf-8'), digest_size=8).hexdigest()
+    stamp = embedding_updated_at.strftime('%Y%m%d%H%M%S') if embedding_updated_at else ''
+    return f"{stamp}:{digest}"
+
+
+def pair_cache_key(pair_id, q1_id, q2_id, q1_version, q2_version):
+    """Identifies one pair's features: a pair's row is only reused while neither question has changed."""
+    return f"{pair_id}|{q1_id}|{q2_id}|{q1_version}|{q2_version}"
+
+
+class PairFeatureCache:
+    """
+    Training features of labeled pairs from the previous retrain, in one npz file: the pair keys and a
+    float32 matrix in FEATURE_COLUMNS order. The whole file is ignored when it was written under a
+    different feature schema or preprocessing version.
+    """
+
+    def __init__(self, path=FEATURE_CACHE_PATH):
+        self.path = path
+
+    def _versions(self):
+        return np.array([FEATURE_SCHEMA_VERSION, PREPROCESS_VERSION, len(FEATURE_COLUMNS)], dtype=np.int64)
+
+    def load(self):
+        """Returns {key: row} and the cached matrix; empty when there is no usable cache."""
+        empty = ({}, np.zeros((0, len(FEATURE_COLUMNS)), dtype=np.float32))
+        if not os.path.exists(self.path):
+            return empty
+        try:
+            with np.load(self.path, allow_pickle=False) as cached:
+                if not np.array_equal(cached['versions'], self._versions()):
+                    print("Feature cache was built with another feature schema; recomputing everything.")
+                    return empty
+                keys, features = cached['keys'], cached['features']
+        except Exception as e:
+            print(f"WARNING: Could not read feature cache {self.path}: {e}")
+            return empty
+        return {key: row for row, key in enumerate(keys.tolist())}, features
+
+    def save(self, keys, features):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez(f, versions=self._versions(), keys=np.array(keys, dtype=str), features=np.asarray(features, dtype=np.float32))
+        os.replace(temp_path, self.path)
@@ -0,0 +1,105 @@
+import threading
+import time
+
+RESOURCES = {}
+
+
+class LazyResource:
+    """
+    A model or in-memory structure that is built on first use or by a background warm-up.
+    The state moves pending -> loading -> ready, or to failed (a later get() retries the load).
+    Every instance is registered in RESOURCES so /ready can report on it.
+    """
+
+    PENDING, LOADING, READY, FAILED = 'pending', 'loading', 'ready', 'failed'
+    RETRY_AFTER_SECONDS = 30
+
+    def __init__(self, name, loader, required=True):
+        self.name = name
+        self.loader = loader
+        self.required = required
+        self.state = self.PENDING
+        self.value = None
+        self.error = None
+        self.load_seconds = None
+        self.failed_at = None
+        self._lock = threading.Lock()
+        self._warm_lock = threading.Lock()
+        self._warming = False
+        RESOURCES[name] = self
+
+    def get(self):
+        """Returns the loaded value, loading it in the calling thread if needed."""
+        if self.state == self.READY:
+            return self.value
+        with self._lock:
+            if self.state == self.READY:
+                return self.value
+            self.state = self.LOADING
+            started_at = time.time()
+            try:
+                self.value = self.loader()
+            except Exception as e:
+                self.state = self.FAILED
+                self.error = str(e)
+                self.failed_at = time.time()
+                print(f"ERROR loading {self.name}: {e}")
+                raise
+            self.load_seconds = round(time.time() - started_at, 3)
+            self.error = None
+            self.state = self.READY
+            print(f"{self.name} ready in {self.load_seconds}s.")
+            return self.value
+
+    def is_ready(self) -> bool:
+        return self.state == self.READY
+
+    def warm_up(self):
+        try:
+            self.get()
+        except Exception:
+            pass
+
+    def warm_up_async(self):
+        """Starts a background load unless one is running or the last failure is too recent."""
+        if self.state == self.READY:
+            return
+        if self.state == self.FAILED and time.time() - self.failed_at < self.RETRY_AFTER_SECONDS:
+            return
+        # get() holds _lock for the whole load, so use a separate lock to keep request threads from waiting.
+        with self._warm_lock:
+            if self._warming:
+                return
+            self._warming = True
+
+        def run():
+            try:
+                self.warm_up()
+            finally:
+                with self._warm_lock:
+                    self._warming = False
+        threading.Thread(target=run, name=f"warm-up-{self.name}", daemon=True).start()
+
+    def describe(self):
+        info = {"state": self.state, "required": self.required}
+        if self.load_seconds is not None:
+            info["load_seconds"] = self.load_seconds
+        if self.error:
+            info["error"] = self.error
+        return info
+
+
+def not_ready(*resources):
+    """Returns the names of the given resources that are not loaded yet, starting a load for pending ones."""
+    missing = []
+    for resource in resources:
+        if not resource.is_ready():
+            resource.warm_up_async()
+            missing.append(resource.name)
+    return missing
+
+
+def readiness_report():
+    components = {name: resource.describe() for name, resource in RESOURCES.items()}
+    ready = all(resource.is_ready() for resource in RESOURCES.values() if resource.required)
+    return ready, components
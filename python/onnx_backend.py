@@ -0,0 +1,203 @@
+import os
+import numpy as np
+
+# INFERENCE_BACKEND=onnx runs the text and image models with ONNX Runtime instead of eager PyTorch.
+# Models are exported once into ONNX_MODEL_DIR (optionally int8-quantized) and must match the torch
+# output to ONNX_PARITY_MIN_COSINE on a fixed probe set; otherwise the torch model is kept. onnx and
+# onnxruntime are optional (requirements-onnx.txt); without them the torch models are used.
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch').lower()
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', 'onnx_models')
+ONNX_QUANTIZE = os.getenv('ONNX_QUANTIZE', 'false').lower() == 'true'
+ONNX_PARITY_MIN_COSINE = float(os.getenv('ONNX_PARITY_MIN_COSINE', 0.99))
+ONNX_OPSET = 17
+
+PARITY_TEXTS = [
+    "How do I find the derivative of x squared?",
+    "Bagaimana cara menghitung luas lingkaran jika diketahui jari-jarinya?",
+    "What is the difference between a list and a tuple in Python?",
+    "Jelaskan perbedaan antara mitosis dan meiosis.",
+    "short",
+]
+
+
+def onnx_enabled():
+    return INFERENCE_BACKEND == 'onnx'
+
+
+def onnx_available():
+    try:
+        import onnx
+        import onnxruntime
+    except ImportError as e:
+        print(f"WARNING: INFERENCE_BACKEND=onnx but ONNX Runtime is not installed ({e}), using PyTorch.")
+        return False
+    return True
+
+
+def backend_id(model):
+    """Names the numerical backend a loaded model runs on, e.g. for keying cached embeddings."""
+    if isinstance(model, (OnnxTextEncoder, OnnxImageModel)):
+        return 'onnx-int8' if ONNX_QUANTIZE else 'onnx'
+    return 'torch'
+
+
+def artifact_path(name, quantized):
+    return os.path.join(ONNX_MODEL_DIR, f"{name}{'.int8' if quantized else ''}.onnx")
+
+
+def create_session(path):
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    threads = os.getenv('ONNX_NUM_THREADS') or os.getenv('TORCH_NUM_THREADS')
+    if threads:
+        options.intra_op_num_threads = int(threads)
+    return ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+
+
+def export_once(name, export):
+    """Exports (and quantizes) a model unless the file already exists; returns the path to load."""
+    os.makedirs(ONNX_MODEL_DIR, exist_ok=True)
+    path = artifact_path(name, quantized=False)
+    if not os.path.exists(path):
+        temp_path = path + '.tmp'
+        export(temp_path)
+        os.replace(temp_path, path)
+        print(f"Exported {name} to {path}.")
+    if not ONNX_QUANTIZE:
+        return path
+    quantized_path = artifact_path(name, quantized=True)
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        temp_path = quantized_path + '.tmp'
+        quantize_dynamic(path, temp_path, weight_type=QuantType.QInt8)
+        os.replace(temp_path, quantized_path)
+        print(f"Quantized {name} to {quantized_path}.")
+    return quantized_path
+
+
+def min_row_cosine(a, b):
+    a, b = np.asarray(a, dtype=np.float32), np.asarray(b, dtype=np.float32)
+    denominator = np.linalg.norm(a, axis=1) * np.linalg.norm(b, axis=1)
+    return float(np.min(np.sum(a * b, axis=1) / np.maximum(denominator, 1e-12)))
+
+
+class OnnxTextEncoder:
+    """Stands in for SentenceTransformer.encode: transformer plus mean pooling in one ONNX graph."""
+
+    def __init__(self, session, tokenizer, max_seq_length, dim):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_seq_length = max_seq_length
+        self.dim = dim
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, texts, batch_size=32, **kwargs):
+        texts = list(texts)
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        # Like sentence-transformers, batch texts of similar length together to keep padding small.
+        order = np.argsort([-len(text) for text in texts], kind='stable')
+        for start in range(0, len(texts), batch_size):
+            batch_idx = order[start:start + batch_size]
+            tokens = self.tokenizer(
+                [texts[i] for i in batch_idx], padding=True, truncation=True,
+                max_length=self.max_seq_length, return_tensors='np'
+            )
+            embeddings[batch_idx] = self.session.run(None, {
+                'input_ids': tokens['input_ids'].astype(np.int64),
+                'attention_mask': tokens['attention_mask'].astype(np.int64),
+            })[0]
+        return embeddings
+
+
+class OnnxImageModel:
+    """Callable like the truncated torch ResNet: takes a (N, 3, H, W) tensor and returns (N, 2048, 1, 1)."""
+
+    def __init__(self, session):
+        self.session = session
+
+    def __call__(self, batch):
+        import torch
+        output = self.session.run(None, {'pixels': batch.detach().cpu().numpy().astype(np.float32)})[0]
+        return torch.from_numpy(output)
+
+
+def export_text_model(model, path):
+    import torch
+    transformer = model[0].auto_model
+
+    class MeanPooledTransformer(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.transformer = transformer
+
+        def forward(self, input_ids, attention_mask):
+            token_embeddings = self.transformer(input_ids=input_ids, attention_mask=attention_mask)[0]
+            mask = attention_mask.unsqueeze(-1).to(token_embeddings.dtype)
+            return (token_embeddings * mask).sum(1) / mask.sum(1).clamp(min=1e-9)
+
+    tokens = model.tokenizer(PARITY_TEXTS[:2], padding=True, return_tensors='pt')
+    torch.onnx.export(
+        MeanPooledTransformer().eval(), (tokens['input_ids'], tokens['attention_mask']), path,
+        input_names=['input_ids', 'attention_mask'], output_names=['sentence_embedding'],
+        dynamic_axes={
+            'input_ids': {0: 'batch', 1: 'sequence'},
+            'attention_mask': {0: 'batch', 1: 'sequence'},
+            'sentence_embedding': {0: 'batch'},
+        },
+        opset_version=ONNX_OPSET
+    )
+
+
+def export_image_model(image_model, path, image_size):
+    import torch
+    torch.onnx.export(
+        image_model.eval(), torch.zeros(1, 3, image_size, image_size), path,
+        input_names=['pixels'], output_names=['features'],
+        dynamic_axes={'pixels': {0: 'batch'}, 'features': {0: 'batch'}},
+        opset_version=ONNX_OPSET
+    )
+
+
+def onnx_text_model(model, name):
+    """Returns an ONNX Runtime encoder for a SentenceTransformer, or the model itself if export or parity fails."""
+    if not onnx_available():
+        return model
+    try:
+        path = export_once(name, lambda target: export_text_model(model, target))
+        encoder = OnnxTextEncoder(
+            create_session(path), model.tokenizer, model.max_seq_length, model.get_sentence_embedding_dimension()
+        )
+        parity = min_row_cosine(encoder.encode(PARITY_TEXTS), model.encode(PARITY_TEXTS))
+    except Exception as e:
+        print(f"ERROR preparing ONNX text model, using PyTorch: {e}")
+        return model
+    if parity < ONNX_PARITY_MIN_COSINE:
+        print(f"ONNX text model parity {parity:.4f} is below {ONNX_PARITY_MIN_COSINE}, using PyTorch.")
+        return model
+    print(f"Using ONNX Runtime text model {path} (parity {parity:.4f}).")
+    return encoder
+
+
+def onnx_image_model(image_model, name, image_size):
+    """Returns an ONNX Runtime stand-in for the torch image model, or the model itself if export or parity fails."""
+    import torch
+    if not onnx_available():
+        return image_model
+    try:
+        path = export_once(name, lambda target: export_image_model(image_model, target, image_size))
+        onnx_model = OnnxImageModel(create_session(path))
+        probe = torch.from_numpy(np.random.default_rng(0).normal(size=(4, 3, image_size, image_size)).astype(np.float32))
+        with torch.inference_mode():
+            expected = image_model(probe).flatten(1).numpy()
+        parity = min_row_cosine(onnx_model(probe).flatten(1).numpy(), expected)
+    except Exception as e:
+        print(f"ERROR preparing ONNX image model, using PyTorch: {e}")
+        return image_model
+    if parity < ONNX_PARITY_MIN_COSINE:
+        print(f"ONNX image model parity {parity:.4f} is below {ONNX_PARITY_MIN_COSINE}, using PyTorch.")
+        return image_model
+    print(f"Using ONNX Runtime image model {path} (parity {parity:.4f}).")
+    return onnx_model
@@ -1,38 +1,100 @@
-import pandas as pd
-import numpy as np
-import joblib
 import os
+import sys
+import multiprocessing
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Retraining runs as its own process next to the API server. Thread pools are capped through the
+# environment before numpy, torch or xgboost start them; spawned feature workers get one thread each.
+RETRAIN_THREADS = max(1, int(os.getenv('RETRAIN_THREADS', 2)))
+for thread_var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'TORCH_NUM_THREADS'):
+    os.environ[thread_var] = '1' if multiprocessing.parent_process() else str(RETRAIN_THREADS)
+
+import numpy as np
+import time
 import re
-from tqdm import tqdm
+import tempfile
+import urllib.request
+try:
+    # POSIX only; on Windows retraining runs without the file lock and the nice/memory limits.
+    import fcntl
+    import resource
+except ImportError:
+    fcntl = resource = None
+from concurrent.futures import ProcessPoolExecutor
 import xgboost as xgb
 from sklearn.model_selection import GroupShuffleSplit
 from sklearn.metrics import classification_report, f1_score
-from dotenv import load_dotenv
 from mysql.connector import pooling
-from shared_features import create_features_from_embeddings
+from shared_features import (
+    FEATURE_CHUNK_SIZE, FEATURE_COLUMNS, FEATURE_SCHEMA_VERSION, PreparedQuestions, PreparedText, build_feature_matrix, load_nlp_models,
+    pair_text_features, preprocess_questions, stored_languages, stored_preprocessed
+)
+from embedding_codec import decode_embedding
+from duplicate_model import BOOSTER_PATH, SCHEMA_PATH, save_duplicate_model
+from feature_cache import PairFeatureCache, pair_cache_key, question_version
 from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
 import spacy
 
-load_dotenv()
-
-def fetch_db_data(db_pool, query, params=None):
-    conn = db_pool.get_connection()
-    cursor = conn.cursor(dictionary=True)
-    cursor.execute(query, params or ())
-    result = cursor.fetchall()
-    cursor.close()
-    conn.close()
-    return result
-
-MODEL_PATH = 'duplicate_classifier_model.pkl'
-TEMP_MODEL_PATH = 'duplicate_classifier_model.pkl.tmp'
 MIN_F1_THRESHOLD = 0.7
+QUESTION_FETCH_CHUNK_SIZE = int(os.getenv('RETRAIN_FETCH_CHUNK_SIZE', 1000))
+QUESTION_FETCH_BATCH_SIZE = 500
+PAIR_FETCH_BATCH_SIZE = int(os.getenv('RETRAIN_PAIR_BATCH_SIZE', 5000))
+# When set, the training feature matrix is a memory-mapped file in this directory instead of RAM.
+RETRAIN_MEMMAP_DIR = os.getenv('RETRAIN_MEMMAP_DIR', '')
+RETRAIN_WORKERS = int(os.getenv('RETRAIN_WORKERS', RETRAIN_THREADS))
+RETRAIN_NICE = int(os.getenv('RETRAIN_NICE', 10))
+RETRAIN_MEMORY_LIMIT_MB = int(os.getenv('RETRAIN_MEMORY_LIMIT_MB', 0))
+RETRAIN_LOCK_PATH = os.getenv('RETRAIN_LOCK_PATH', 'retrain.lock')
+RETRAIN_NOTIFY_URL = os.getenv('RETRAIN_NOTIFY_URL', 'http://127.0.0.1:5000/ai/duplicate_model/reload')
+RETRAIN_NOTIFY_TOKEN = os.getenv('RETRAIN_NOTIFY_TOKEN', '')
+SHARDS_PER_WORKER = 4
+MIN_PARALLEL_QUESTIONS = 200
+MIN_PARALLEL_PAIRS = 2000
+
+# Feature generation is GIL-bound (spaCy, langdetect, fuzzywuzzy), so it is sharded across processes.
+# Each worker builds its state once in the initializer; pool.map returns shards in submission order,
+# so the merged result does not depend on scheduling.
+_worker_nlp_models = None
+_worker_text = None
+
+def init_preprocess_worker():
+    global _worker_nlp_models
+    _worker_nlp_models = load_nlp_models()
+
+def preprocess_shard(shard):
+    questions, languages = shard
+    return preprocess_questions(questions, *_worker_nlp_models, n_process=1, languages=languages)
 
-def archive_old_model(model_path_to_archive):
+def init_text_feature_worker(preprocessed):
+    global _worker_text
+    _worker_text = PreparedText(preprocessed)
+
+def text_feature_shard(shard):
+    left_idx, right_idx = shard
+    return pair_text_features(_worker_text, _worker_text, left_idx, right_idx)
+
+def shard_bounds(count, workers):
+    shards = max(1, min(count, workers * SHARDS_PER_WORKER))
+    bounds = np.linspace(0, count, shards + 1).astype(int)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def run_sharded(worker, shards, initializer, initargs=()):
+    # Spawned, not forked, so workers behave the same on every platform and start from a clean
+    # interpreter instead of inheriting the parent's loaded models and thread pools.
+    with ProcessPoolExecutor(
+        max_workers=min(RETRAIN_WORKERS, len(shards)), mp_context=multiprocessing.get_context('spawn'),
+        initializer=initializer, initargs=initargs
+    ) as pool:
+        return list(pool.map(worker, shards))
+
+def archive_old_model(model_path_to_archive, schema_path=None):
     """
-    Checks if a model exists at the given path and renames it to the next
-    available version number (e.g., _1, _2, etc.).
+    Checks if a model exists at the given path and copies it (and its schema
+    sidecar) to the next available version number (e.g., _1, _2, etc.).
+    The live files stay in place until the new model replaces them.
     """
     if not os.path.exists(model_path_to_archive):
         print("No old model found to archive. Skipping.")
@@ -41,9 +103,9 @@ def archive_old_model(model_path_to_archive):
     print(f"Found old model at '{model_path_to_archive}'. Archiving it...")
     
     directory = os.path.dirname(model_path_to_archive) or '.'
-    base_name = os.path.basename(model_path_to_archive).replace('.pkl', '')
+    base_name, extension = os.path.splitext(os.path.basename(model_path_to_archive))
     
-    archive_pattern = re.compile(rf"^{re.escape(base_name)}_(\d+)\.pkl$")
+    archive_pattern = re.compile(rf"^{re.escape(base_name)}_(\d+){re.escape(extension)}$")
     
     versions = []
     for filename in os.listdir(directory):
@@ -53,11 +115,14 @@ def archive_old_model(model_path_to_archive):
             
     next_version = (max(versions) + 1) if versions else 1
     
-    archive_filename = f"{base_name}_{next_version}.pkl"
+    archive_filename = f"{base_name}_{next_version}{extension}"
     archive_path = os.path.join(directory, archive_filename)
     
     try:
-        os.rename(model_path_to_archive, archive_path)
+        # Hard links keep the serving model readable the whole time; the watcher never sees a gap.
+        os.link(model_path_to_archive, archive_path)
+        if schema_path and os.path.exists(schema_path):
+            os.link(schema_path, os.path.join(directory, f"{base_name}_{next_version}.schema.json"))
         print(f"SUCCESS: Old model archived to '{archive_path}'")
     except OSError as e:
         print(f"ERROR: Could not archive old model: {e}")
@@ -80,42 +145,89 @@ def safe_model_retrain():
         print(f"ERROR: Could not initialize models or DB for retraining: {e}")
         return
 
-    labeled_pairs = fetch_all_labeled_pairs(db_pool)
-    if len(labeled_pairs) < 50:
-        print(f"Not enough new data ({len(labeled_pairs)} pairs). Skipping retraining.")
+    pairs = fetch_all_labeled_pairs(db_pool)
+    if len(pairs) < 50:
+        print(f"Not enough new data ({len(pairs)} pairs). Skipping retraining.")
         return
         
-    features_list, labels, groups = [], [], []
-    question_data_cache = {}
+    data = fetch_question_data(db_pool, pairs.question_ids)
 
-    for pair in tqdm(labeled_pairs, desc="Creating training features"):
-        q1_id, q2_id = pair['question1_id'], pair['question2_id']
-        
-        for q_id in [q1_id, q2_id]:
-            if q_id not in question_data_cache:
-                question_data_cache[q_id] = fetch_question_data(db_pool, q_id)
+    # Pairs whose questions were not found are dropped; groups are the q1 codes, i.e. q1_id.
+    row_of_code = np.array([data.row_of.get(q_id, -1) for q_id in pairs.question_ids], dtype=np.int64)
+    left_idx, right_idx = row_of_code[pairs.q1], row_of_code[pairs.q2]
+    keep = np.flatnonzero((left_idx >= 0) & (right_idx >= 0))
+    left_idx, right_idx = left_idx[keep], right_idx[keep]
+    labels, groups = pairs.labels[keep], pairs.q1[keep]
+    cache_keys = [
+        pair_cache_key(
+            pairs.ids[k], pairs.question_ids[pairs.q1[k]], pairs.question_ids[pairs.q2[k]],
+            data.versions[left], data.versions[right]
+        )
+        for k, left, right in zip(keep.tolist(), left_idx.tolist(), right_idx.tolist())
+    ]
+    del pairs, row_of_code, keep
 
-        q1_data, q2_data = question_data_cache[q1_id], question_data_cache[q2_id]
-        if not q1_data or not q2_data: continue
+    # Pairs whose questions are unchanged since the last retrain reuse their cached features.
+    feature_cache = PairFeatureCache()
+    cached_rows, cached_features = feature_cache.load()
+    features = allocate_feature_matrix(len(cache_keys))
+    hits = np.array([key in cached_rows for key in cache_keys], dtype=bool)
+    if hits.any():
+        features[hits] = cached_features[[cached_rows[key] for key, hit in zip(cache_keys, hits) if hit]]
+    misses = np.flatnonzero(~hits)
+    print(f"Feature cache: {int(hits.sum())} pairs reused, {len(misses)} to compute.")
 
-        features = create_features_from_embeddings(
-            q1_data['title'], q1_data['question'], q1_data.get('text_embedding'), q1_data.get('image_embedding'),
-            q2_data['title'], q2_data['question'], q2_data.get('text_embedding'), q2_data.get('image_embedding'),
-            nlp_en=nlp_en, stemmer_id=stemmer_id, stopword_remover_id=stopword_remover_id
-        )
-        features_list.append(features)
-        labels.append(pair['is_duplicate'])
-        groups.append(q1_id)
+    # Only questions in uncached pairs need clean text; those without it are preprocessed in one batch.
+    needed = set(left_idx[misses].tolist()) | set(right_idx[misses].tolist())
+    stale = sorted(row for row in needed if data.preprocessed[row] is None)
+    if stale:
+        print(f"Preprocessing {len(stale)} question(s) without stored clean text...")
+        stale_questions = [(data.titles[row], data.questions[row]) for row in stale]
+        stale_languages = [data.languages[row] for row in stale]
+        if RETRAIN_WORKERS > 1 and len(stale) >= MIN_PARALLEL_QUESTIONS:
+            shards = [(stale_questions[a:b], stale_languages[a:b]) for a, b in shard_bounds(len(stale), RETRAIN_WORKERS)]
+            cleaned = [clean for part in run_sharded(preprocess_shard, shards, init_preprocess_worker) for clean in part]
+        else:
+            cleaned = preprocess_questions(
+                stale_questions, nlp_en, stemmer_id, stopword_remover_id, languages=stale_languages
+            )
+        for row, clean in zip(stale, cleaned):
+            data.preprocessed[row] = clean
+
+    preprocessed = [clean or ('', '') for clean in data.preprocessed]
+    prepared = PreparedQuestions(data.questions, preprocessed, data.text, data.image, data.image_row)
+
+    if len(misses):
+        print(f"Creating training features for {len(misses)} pairs...")
+        miss_left, miss_right = left_idx[misses], right_idx[misses]
+        text_features = None
+        if RETRAIN_WORKERS > 1 and len(misses) >= MIN_PARALLEL_PAIRS:
+            shards = [(miss_left[a:b], miss_right[a:b]) for a, b in shard_bounds(len(misses), RETRAIN_WORKERS)]
+            text_features = np.vstack(run_sharded(
+                text_feature_shard, shards, init_text_feature_worker, (preprocessed,)
+            ))
+        # Written chunk by chunk so only one chunk of intermediate arrays exists at a time.
+        for start in range(0, len(misses), FEATURE_CHUNK_SIZE):
+            end = start + FEATURE_CHUNK_SIZE
+            features[misses[start:end]] = build_feature_matrix(
+                prepared, prepared, miss_left[start:end], miss_right[start:end],
+                text_features=text_features[start:end] if text_features is not None else None
+            )
+        del text_features
+    del prepared, preprocessed, data
+    feature_cache.save(cache_keys, features)
+    del cached_rows, cached_features, cache_keys
 
-    df_features = pd.DataFrame(features_list)
-    y = pd.Series(labels)
     gss = GroupShuffleSplit(n_splits=1, test_size=0.2, random_state=42)
-    train_idx, test_idx = next(gss.split(df_features, y, groups=groups))
-    X_train, X_test = df_features.iloc[train_idx], df_features.iloc[test_idx]
-    y_train, y_test = y.iloc[train_idx], y.iloc[test_idx]
+    train_idx, test_idx = next(gss.split(np.zeros((len(labels), 1), dtype=np.int8), labels, groups=groups))
+    X_train, X_test = features[train_idx], features[test_idx]
+    y_train, y_test = labels[train_idx], labels[test_idx]
+    del features
     
     print("Training new XGBoost model...")
-    model = xgb.XGBClassifier(objective='binary:logistic', eval_metric='logloss', use_label_encoder=False)
+    model = xgb.XGBClassifier(
+        objective='binary:logistic', eval_metric='logloss', use_label_encoder=False, n_jobs=RETRAIN_THREADS
+    )
     model.fit(X_train, y_train)
 
     print("\n--- New Model Evaluation ---")
@@ -127,36 +239,224 @@ def safe_model_retrain():
     if new_f1 >= MIN_F1_THRESHOLD:
         print(f"New model F1 score ({new_f1:.4f}) meets threshold.")
         
-        archive_old_model(MODEL_PATH)
+        archive_old_model(BOOSTER_PATH, SCHEMA_PATH)
         
-        print(f"Saving new model to '{MODEL_PATH}'...")
-        joblib.dump(model, TEMP_MODEL_PATH)
-        os.replace(TEMP_MODEL_PATH, MODEL_PATH)
+        print(f"Saving new model to '{BOOSTER_PATH}'...")
+        save_duplicate_model(
+            model, FEATURE_COLUMNS, feature_schema_version=FEATURE_SCHEMA_VERSION, f1=round(float(new_f1), 4),
+            trained_at=time.strftime('%Y-%m-%dT%H:%M:%S'), training_pairs=len(labels)
+        )
         print(f"SUCCESS: New model has been trained and saved.")
-    else:
-        print(f"FAIL: New model F1 score ({new_f1:.4f}) is below threshold of {MIN_F1_THRESHOLD}. Keeping old model.")
+        print("--- Retraining Pipeline Finished ---")
+        return True
 
+    print(f"FAIL: New model F1 score ({new_f1:.4f}) is below threshold of {MIN_F1_THRESHOLD}. Keeping old model.")
     print("--- Retraining Pipeline Finished ---")
+    return False
 
 
+def allocate_feature_matrix(count):
+    """A float32 (count, features) matrix, memory-mapped in RETRAIN_MEMMAP_DIR when that is set."""
+    shape = (count, len(FEATURE_COLUMNS))
+    if not RETRAIN_MEMMAP_DIR:
+        return np.zeros(shape, dtype=np.float32)
+    fd, path = tempfile.mkstemp(suffix='.npy', dir=RETRAIN_MEMMAP_DIR)
+    os.close(fd)
+    features = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+    # The mapping outlives the name, so nothing is left behind if the run is killed.
+    os.unlink(path)
+    return features
+
+class LabeledPairs:
+    """
+    Labeled pairs in compact arrays: question ids are factorized into codes, so q1 and q2 are int32
+    indices into question_ids and labels are int8. Arrays are sized from a COUNT taken up front.
+    """
+
+    def __init__(self, capacity):
+        self.ids = []
+        self.question_ids = []
+        self.code_of = {}
+        self.q1 = np.zeros(capacity, dtype=np.int32)
+        self.q2 = np.zeros(capacity, dtype=np.int32)
+        self.labels = np.zeros(capacity, dtype=np.int8)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def code(self, question_id):
+        code = self.code_of.get(question_id)
+        if code is None:
+            code = self.code_of[question_id] = len(self.question_ids)
+            self.question_ids.append(question_id)
+        return code
+
+    def add(self, pair_id, question1_id, question2_id, is_duplicate):
+        index = len(self.ids)
+        self.ids.append(pair_id)
+        self.q1[index] = self.code(question1_id)
+        self.q2[index] = self.code(question2_id)
+        self.labels[index] = is_duplicate
+
+    def finish(self):
+        count = len(self.ids)
+        self.q1, self.q2, self.labels = self.q1[:count], self.q2[:count], self.labels[:count]
+        self.code_of = None
+        return self
+
 def fetch_all_labeled_pairs(db_pool):
+    """Streams labeled_duplicate_pairs through an unbuffered cursor into a LabeledPairs."""
     print("Fetching all labeled pairs from the database...")
-    query = "SELECT question1_id, question2_id, is_duplicate FROM labeled_duplicate_pairs"
-    return fetch_db_data(db_pool, query)
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM labeled_duplicate_pairs")
+        count = cursor.fetchone()[0]
+        cursor.close()
+
+        pairs = LabeledPairs(count)
+        # Rows added after the COUNT wait for the next retrain.
+        cursor = conn.cursor(buffered=False)
+        cursor.execute(
+            "SELECT id, question1_id, question2_id, is_duplicate FROM labeled_duplicate_pairs LIMIT %s", (count,)
+        )
+        while True:
+            rows = cursor.fetchmany(PAIR_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                pairs.add(*row)
+        cursor.close()
+    finally:
+        conn.close()
+    print(f"Loaded {len(pairs)} labeled pairs over {len(pairs.question_ids)} questions.")
+    return pairs.finish()
+
+class QuestionData:
+    """
+    Questions loaded for retraining, one row each. Text embeddings fill an (N, d) matrix (zero rows
+    where missing); image embeddings fill a compact matrix indexed by image_row (-1 for no image).
+    """
 
-def fetch_question_data(db_pool, question_id):
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.ids, self.titles, self.questions, self.preprocessed, self.languages = [], [], [], [], []
+        self.versions = []
+        self.row_of = {}
+        self.text = None
+        self.image = None
+        self.image_count = 0
+        self.image_row = np.full(capacity, -1, dtype=np.int64)
+
+    def add(self, row):
+        index = len(self.ids)
+        self.row_of[row['id']] = index
+        self.ids.append(row['id'])
+        self.titles.append(row['title'] or '')
+        self.questions.append(row['question'] or '')
+        self.preprocessed.append(stored_preprocessed(row))
+        self.languages.append(stored_languages(row))
+        self.versions.append(question_version(self.titles[index], self.questions[index], row['embedding_updated_at']))
+
+        text_emb = decode_embedding(row['text_embedding'])
+        if text_emb is not None:
+            if self.text is None:
+                self.text = np.zeros((self.capacity, len(text_emb)), dtype=np.float32)
+            self.text[index] = text_emb
+        img_emb = decode_embedding(row['image_embedding'])
+        if img_emb is not None:
+            if self.image is None:
+                self.image = np.zeros((max(64, self.capacity // 8), len(img_emb)), dtype=np.float32)
+            elif self.image_count == len(self.image):
+                grown = np.zeros((min(self.capacity, 2 * len(self.image)), self.image.shape[1]), dtype=np.float32)
+                grown[:self.image_count] = self.image
+                self.image = grown
+            self.image[self.image_count] = img_emb
+            self.image_row[index] = self.image_count
+            self.image_count += 1
+
+    def finish(self):
+        count = len(self.ids)
+        self.text = self.text[:count] if self.text is not None else np.zeros((count, 0), dtype=np.float32)
+        self.image = self.image[:self.image_count] if self.image is not None else np.zeros((0, 0), dtype=np.float32)
+        self.image_row = self.image_row[:count]
+        return self
+
+def fetch_question_data(db_pool, question_ids):
+    """Loads the given questions with chunked IN queries over one connection, streamed with fetchmany."""
     query = """
-        SELECT q.title, q.question, qe.text_embedding, qe.image_embedding
+        SELECT q.id, q.title, q.question, qe.text_embedding, qe.image_embedding,
+               qe.clean_title, qe.clean_question, qe.preprocess_version, qe.title_language, qe.question_language,
+               qe.updated_at AS embedding_updated_at
         FROM questions q
         LEFT JOIN question_embeddings qe ON q.id = qe.question_id
-        WHERE q.id = %s
+        WHERE q.id IN ({})
     """
-    results = fetch_db_data(db_pool, query, (question_id,))
-    if not results: return None
-    data = results[0]
-    if data.get('text_embedding'): data['text_embedding'] = np.frombuffer(data['text_embedding'], dtype=np.float32)
-    if data.get('image_embedding'): data['image_embedding'] = np.frombuffer(data['image_embedding'], dtype=np.float32)
-    return data
+    data = QuestionData(len(question_ids))
+    conn = db_pool.get_connection()
+    try:
+        cursor = conn.cursor(dictionary=True)
+        for start in range(0, len(question_ids), QUESTION_FETCH_CHUNK_SIZE):
+            chunk = question_ids[start:start + QUESTION_FETCH_CHUNK_SIZE]
+            cursor.execute(query.format(','.join(['%s'] * len(chunk))), tuple(chunk))
+            while True:
+                rows = cursor.fetchmany(QUESTION_FETCH_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    data.add(row)
+        cursor.close()
+    finally:
+        conn.close()
+    print(f"Loaded {len(data.ids)} of {len(question_ids)} questions ({data.image_count} with images).")
+    return data.finish()
+
+def acquire_retrain_lock():
+    """Returns the locked file, or None if another retraining run holds it. The lock dies with the process."""
+    lock_file = open(RETRAIN_LOCK_PATH, 'w')
+    if fcntl is None:
+        print("WARNING: File locking is not available on this platform; overlapping runs are not prevented.")
+        return lock_file
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file
+
+def apply_resource_limits():
+    # Both limits are inherited by the spawned feature workers; RLIMIT_AS applies to each process.
+    if RETRAIN_NICE:
+        if hasattr(os, 'nice'):
+            os.nice(RETRAIN_NICE)
+        else:
+            print("WARNING: os.nice is not available on this platform; RETRAIN_NICE is ignored.")
+    if RETRAIN_MEMORY_LIMIT_MB:
+        if resource is None:
+            print("WARNING: Memory limits are not available on this platform; RETRAIN_MEMORY_LIMIT_MB is ignored.")
+            return
+        limit = RETRAIN_MEMORY_LIMIT_MB * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        print(f"Retraining memory limited to {RETRAIN_MEMORY_LIMIT_MB} MB per process.")
+
+def notify_server():
+    """Asks the API server to check for the new model now instead of at its next watch interval."""
+    if not RETRAIN_NOTIFY_URL:
+        return
+    try:
+        headers = {'X-Retrain-Token': RETRAIN_NOTIFY_TOKEN} if RETRAIN_NOTIFY_TOKEN else {}
+        urllib.request.urlopen(
+            urllib.request.Request(RETRAIN_NOTIFY_URL, headers=headers, method='POST'), timeout=5
+        ).close()
+        print("API server notified of the new model.")
+    except Exception as e:
+        print(f"WARNING: Could not notify the API server, its model watcher will pick up the new model: {e}")
 
 if __name__ == '__main__':
-    safe_model_retrain()
\ No newline at end of file
+    lock = acquire_retrain_lock()
+    if lock is None:
+        print("Another retraining run is already in progress. Exiting.")
+        sys.exit(0)
+    apply_resource_limits()
+    if safe_model_retrain():
+        notify_server()
\ No newline at end of file
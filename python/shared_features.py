@@ -1,9 +1,40 @@
+import hashlib
+import os
 import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import numpy as np
 from fuzzywuzzy import fuzz
-from langdetect import detect
+from langdetect import DetectorFactory, detect
 from langdetect.lang_detect_exception import LangDetectException
 
+# langdetect samples randomly; a fixed seed makes the same text always get the same language.
+DetectorFactory.seed = 0
+
+# Stored cleaned text (question_embeddings.clean_title/clean_question) carries this stamp.
+# Bump it whenever preprocessing output changes so stale rows are recomputed instead of reused.
+PREPROCESS_VERSION = 2
+
+# Only the tagger, attribute ruler and lemmatizer feed lemma_/is_stop; the parser and NER are dead weight.
+UNUSED_SPACY_COMPONENTS = ('parser', 'ner')
+SPACY_BATCH_SIZE = int(os.getenv('SPACY_BATCH_SIZE', 64))
+SPACY_N_PROCESS = int(os.getenv('SPACY_N_PROCESS', 1))
+
+def load_nlp_models():
+    try:
+        import spacy
+        from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+        from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
+        stemmer_id = StemmerFactory().create_stemmer()
+        stopword_remover_id = StopWordRemoverFactory().create_stop_word_remover()
+        nlp_en = spacy.load("en_core_web_sm")
+        print("Successfully loaded Sastrawi and spaCy models.")
+    except Exception as e:
+        print(f"ERROR loading NLP helper models: {e}")
+        stemmer_id, stopword_remover_id, nlp_en = None, None, None
+    return nlp_en, stemmer_id, stopword_remover_id
+
 def simple_preprocess(text: str) -> str:
     if not isinstance(text, str): return ""
     text = text.lower()
@@ -11,26 +42,140 @@ def simple_preprocess(text: str) -> str:
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
+# Words that are frequent in one language and never words of the other. ASCII text with at least
+# LANGUAGE_FAST_PATH_MIN_HITS of one list and none of the other is classified without langdetect.
+ENGLISH_MARKERS = frozenset((
+    'the', 'is', 'are', 'was', 'were', 'and', 'of', 'to', 'what', 'how', 'why', 'which', 'this', 'that',
+    'with', 'for', 'does', 'do', 'can', 'my', 'it', 'be', 'not', 'have', 'has', 'from', 'you', 'when', 'should'
+))
+INDONESIAN_MARKERS = frozenset((
+    'yang', 'dan', 'di', 'ke', 'dari', 'ini', 'itu', 'adalah', 'dengan', 'untuk', 'tidak', 'apa', 'bagaimana',
+    'mengapa', 'kenapa', 'saya', 'dalam', 'pada', 'bisa', 'akan', 'atau', 'juga', 'ada', 'sudah', 'cara',
+    'jika', 'karena', 'seperti', 'oleh', 'agar', 'apakah', 'tolong'
+))
+LANGUAGE_FAST_PATH_MIN_HITS = 2
+LANGUAGE_CACHE_SIZE = int(os.getenv('LANGUAGE_CACHE_SIZE', 50000))
+_language_cache = OrderedDict()
+_language_cache_lock = threading.Lock()
+
+def detect_language_fast(text: str):
+    """Stopword vote for plain-ASCII text; None when it is not clear-cut."""
+    if not text.isascii():
+        return None
+    words = re.findall(r"[a-z]+", text)
+    english = sum(word in ENGLISH_MARKERS for word in words)
+    indonesian = sum(word in INDONESIAN_MARKERS for word in words)
+    if english >= LANGUAGE_FAST_PATH_MIN_HITS and indonesian == 0:
+        return 'en'
+    if indonesian >= LANGUAGE_FAST_PATH_MIN_HITS and english == 0:
+        return 'id'
+    return None
+
 def detect_language(text: str) -> str:
-    try:
-        if text and len(text.strip()) > 10: return detect(text)
-        return "unknown"
-    except LangDetectException:
+    if not text or len(text.strip()) <= 10:
         return "unknown"
+    key = hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+    with _language_cache_lock:
+        lang = _language_cache.get(key)
+        if lang is not None:
+            _language_cache.move_to_end(key)
+            return lang
+
+    lang = detect_language_fast(text)
+    if lang is None:
+        try:
+            lang = detect(text)
+        except LangDetectException:
+            lang = "unknown"
+
+    with _language_cache_lock:
+        _language_cache[key] = lang
+        if len(_language_cache) > LANGUAGE_CACHE_SIZE:
+            _language_cache.popitem(last=False)
+    return lang
+
+@lru_cache(maxsize=int(os.getenv('INDONESIAN_PREPROCESS_CACHE_SIZE', 20000)))
+def preprocess_indonesian(cleaned_text: str, stemmer_id, stopword_remover_id) -> str:
+    stemmed_text = stemmer_id.stem(cleaned_text)
+    return stopword_remover_id.remove(stemmed_text)
+
+def multilingual_preprocess_batch(texts, nlp_en=None, stemmer_id=None, stopword_remover_id=None,
+                                  n_process=None, batch_size=None, languages=None) -> list:
+    """
+    multilingual_preprocess for many texts at once. Texts are grouped by detected language: English
+    goes through one nlp_en.pipe call (optionally across n_process processes), Indonesian through
+    the memoized Sastrawi stemmer. `languages` may supply already known languages (None entries are detected).
+    """
+    results = [""] * len(texts)
+    english = []
+    for i, text in enumerate(texts):
+        cleaned_text = simple_preprocess(text)
+        if not cleaned_text: continue
+        lang = (languages[i] if languages else None) or detect_language(cleaned_text)
+        if lang == 'id' and stemmer_id and stopword_remover_id:
+            results[i] = preprocess_indonesian(cleaned_text, stemmer_id, stopword_remover_id)
+        elif lang == 'en' and nlp_en:
+            english.append((i, cleaned_text))
+        else:
+            results[i] = cleaned_text
+
+    if english:
+        docs = nlp_en.pipe(
+            (cleaned_text for _, cleaned_text in english),
+            disable=[name for name in UNUSED_SPACY_COMPONENTS if name in nlp_en.pipe_names],
+            batch_size=batch_size or SPACY_BATCH_SIZE,
+            n_process=n_process or SPACY_N_PROCESS
+        )
+        for (i, _), doc in zip(english, docs):
+            tokens = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct]
+            results[i] = " ".join(tokens)
+    return results
 
 def multilingual_preprocess(text: str, nlp_en=None, stemmer_id=None, stopword_remover_id=None) -> str:
-    cleaned_text = simple_preprocess(text)
-    if not cleaned_text: return ""
-    lang = detect_language(cleaned_text)
-    if lang == 'id' and stemmer_id and stopword_remover_id:
-        stemmed_text = stemmer_id.stem(cleaned_text)
-        return stopword_remover_id.remove(stemmed_text)
-    elif lang == 'en' and nlp_en:
-        doc = nlp_en(cleaned_text)
-        tokens = [token.lemma_ for token in doc if not token.is_stop and not token.is_punct]
-        return " ".join(tokens)
-    else:
-        return cleaned_text
+    return multilingual_preprocess_batch([text], nlp_en, stemmer_id, stopword_remover_id, n_process=1)[0]
+
+def preprocess_question(title, question, nlp_en=None, stemmer_id=None, stopword_remover_id=None):
+    """Returns (clean title, clean question) as used by the similarity features."""
+    return preprocess_questions([(title, question)], nlp_en, stemmer_id, stopword_remover_id, n_process=1)[0]
+
+def preprocess_questions(questions, nlp_en=None, stemmer_id=None, stopword_remover_id=None, n_process=None,
+                         languages=None) -> list:
+    """preprocess_question for a list of (title, question) pairs, in one batch; `languages` holds (title, question) languages or None."""
+    flat_languages = None
+    if languages:
+        flat_languages = [lang for pair in languages for lang in (pair or (None, None))]
+    flat = multilingual_preprocess_batch(
+        [text for pair in questions for text in pair], nlp_en, stemmer_id, stopword_remover_id,
+        n_process=n_process, languages=flat_languages
+    )
+    return list(zip(flat[0::2], flat[1::2]))
+
+def detect_question_languages(title, question):
+    return detect_language(simple_preprocess(title)), detect_language(simple_preprocess(question))
+
+def preprocess_for_storage(questions, nlp_en=None, stemmer_id=None, stopword_remover_id=None, n_process=None) -> list:
+    """
+    Returns (clean title, clean question, PREPROCESS_VERSION, title language, question language) per
+    (title, question). The clean text and version are None when the NLP models are missing.
+    """
+    languages = [detect_question_languages(title, question) for title, question in questions]
+    if not (nlp_en and stemmer_id and stopword_remover_id):
+        # Output without the models differs from the real thing; don't stamp it as current.
+        return [(None, None, None) + langs for langs in languages]
+    preprocessed = preprocess_questions(questions, nlp_en, stemmer_id, stopword_remover_id, n_process, languages)
+    return [pair + (PREPROCESS_VERSION,) + langs for pair, langs in zip(preprocessed, languages)]
+
+def stored_preprocessed(row):
+    """The (clean title, clean question) stored on a question_embeddings row if it is current, else None."""
+    if row.get('preprocess_version') != PREPROCESS_VERSION or row.get('clean_title') is None:
+        return None
+    return row['clean_title'], row.get('clean_question') or ''
+
+def stored_languages(row):
+    """The (title, question) languages stored on a question_embeddings row, or None if never detected."""
+    if not row.get('title_language'):
+        return None
+    return row['title_language'], row.get('question_language')
 
 def jaccard_similarity(list1, list2):
     s1 = set(list1)
@@ -38,59 +183,155 @@ def jaccard_similarity(list1, list2):
     if not s1 and not s2: return 0.0
     return len(s1.intersection(s2)) / len(s1.union(s2))
 
+# Column order shared by training and serving; the model's sidecar schema records the version.
+FEATURE_COLUMNS = (
+    'len_char_q1', 'len_char_q2', 'len_word_q1', 'len_word_q2', 'len_diff_word',
+    'fuzz_avg', 'fuzz_max', 'cosine_max', 'cosine_avg', 'cosine_cross_max',
+    'jaccard_title', 'jaccard_question', 'jaccard_cross_avg', 'image_similarity'
+)
+FEATURE_SCHEMA_VERSION = 1
+FEATURE_CHUNK_SIZE = 8192
+
+def unit_rows(vectors, dim=None):
+    """Stacks optional vectors (or takes an (N, d) matrix) into unit rows; missing (None) or zero vectors become zero rows."""
+    if isinstance(vectors, np.ndarray) and vectors.ndim == 2:
+        matrix = vectors.astype(np.float32, copy=True)
+    else:
+        present = [v for v in vectors if v is not None]
+        dim = dim or (len(present[0]) if present else 0)
+        matrix = np.zeros((len(vectors), dim), dtype=np.float32)
+        for i, vector in enumerate(vectors):
+            if vector is not None:
+                matrix[i] = vector
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+
+# Columns filled by pair_text_features, in this order: the per-pair Python loop of the builder.
+TEXT_FEATURE_COLUMNS = ('fuzz_avg', 'fuzz_max', 'jaccard_title', 'jaccard_question', 'jaccard_cross_avg')
+
+class PreparedText:
+    """Clean (title, question) text and token sets per question: all that the fuzzy and Jaccard features need."""
+
+    def __init__(self, preprocessed):
+        self.title_clean = [pair[0] for pair in preprocessed]
+        self.question_clean = [pair[1] for pair in preprocessed]
+        self.title_tokens = [set(text.split()) for text in self.title_clean]
+        self.question_tokens = [set(text.split()) for text in self.question_clean]
+        self.all_tokens = [t | q for t, q in zip(self.title_tokens, self.question_tokens)]
+
+class PreparedQuestions(PreparedText):
+    """
+    The per-question inputs of the similarity features, computed once per question instead of once
+    per pair: lengths, clean text, token sets and unit-normalized embedding matrices.
+
+    text_embs is a vector per question or an (N, d) matrix. img_embs is a vector or None per question,
+    or, together with image_row, a compact matrix holding only the questions that have an image
+    (image_row[i] is question i's row in it, -1 for none).
+    """
+
+    def __init__(self, questions, preprocessed, text_embs, img_embs, image_row=None):
+        super().__init__(preprocessed)
+        questions = [question or '' for question in questions]
+        self.len_char = np.array([len(question) for question in questions], dtype=np.float32)
+        self.len_word = np.array([len(question.split()) for question in questions], dtype=np.float32)
+        self.text = unit_rows(text_embs if isinstance(text_embs, np.ndarray) else list(text_embs))
+        if image_row is None:
+            img_embs = list(img_embs)
+            image_row = np.cumsum([emb is not None for emb in img_embs]) - 1
+            image_row[[emb is None for emb in img_embs]] = -1
+            img_embs = [emb for emb in img_embs if emb is not None]
+        self.image = unit_rows(img_embs)
+        self.image_row = np.asarray(image_row, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.len_char)
+
+def jaccard_sets(s1, s2):
+    if not s1 and not s2: return 0.0
+    return len(s1 & s2) / len(s1 | s2)
+
+def rowwise_cosine(left, right, left_idx, right_idx):
+    """Cosine of unit rows left[left_idx[k]] . right[right_idx[k]], as one matrix-vector product when there is one query."""
+    if left.shape[1] == 0 or right.shape[1] != left.shape[1]:
+        return np.zeros(len(left_idx), dtype=np.float32)
+    if len(left) == 1:
+        return (right @ left[0])[right_idx]
+    out = np.empty(len(left_idx), dtype=np.float32)
+    for start in range(0, len(left_idx), FEATURE_CHUNK_SIZE):
+        end = start + FEATURE_CHUNK_SIZE
+        out[start:end] = np.einsum('ij,ij->i', left[left_idx[start:end]], right[right_idx[start:end]])
+    return out
+
+def pair_text_features(left: PreparedText, right: PreparedText, left_idx, right_idx) -> np.ndarray:
+    """The TEXT_FEATURE_COLUMNS of each pair; independent per pair, so it can be sharded across processes."""
+    features = np.zeros((len(left_idx), len(TEXT_FEATURE_COLUMNS)), dtype=np.float32)
+    for k, (i, j) in enumerate(zip(np.asarray(left_idx).tolist(), np.asarray(right_idx).tolist())):
+        fuzz_title = fuzz.QRatio(left.title_clean[i], right.title_clean[j]) / 100.0
+        fuzz_question = fuzz.QRatio(left.question_clean[i], right.question_clean[j]) / 100.0
+        features[k, 0] = (fuzz_title + fuzz_question) / 2
+        features[k, 1] = max(fuzz_title, fuzz_question)
+        features[k, 2] = jaccard_sets(left.title_tokens[i], right.title_tokens[j])
+        features[k, 3] = jaccard_sets(left.question_tokens[i], right.question_tokens[j])
+        features[k, 4] = jaccard_sets(left.all_tokens[i], right.all_tokens[j])
+    return features
+
+def build_feature_matrix(left: PreparedQuestions, right: PreparedQuestions, left_idx=None, right_idx=None,
+                         text_features=None) -> np.ndarray:
+    """
+    Features for the pairs (left[left_idx[k]], right[right_idx[k]]) as a float32 matrix in FEATURE_COLUMNS
+    order. Without indices, a single left question is paired with every right question. text_features may
+    carry pair_text_features computed elsewhere (e.g. in worker processes).
+    """
+    if left_idx is None:
+        left_idx = np.zeros(len(right), dtype=np.int64)
+        right_idx = np.arange(len(right))
+    left_idx, right_idx = np.asarray(left_idx, dtype=np.int64), np.asarray(right_idx, dtype=np.int64)
+    features = np.zeros((len(left_idx), len(FEATURE_COLUMNS)), dtype=np.float32)
+    if not len(left_idx):
+        return features
+
+    len_word_q1, len_word_q2 = left.len_word[left_idx], right.len_word[right_idx]
+    features[:, 0] = left.len_char[left_idx]
+    features[:, 1] = right.len_char[right_idx]
+    features[:, 2] = len_word_q1
+    features[:, 3] = len_word_q2
+    features[:, 4] = np.abs(len_word_q1 - len_word_q2) / np.maximum(np.maximum(len_word_q1, len_word_q2), 1)
+
+    if text_features is None:
+        text_features = pair_text_features(left, right, left_idx, right_idx)
+    features[:, [FEATURE_COLUMNS.index(name) for name in TEXT_FEATURE_COLUMNS]] = text_features
+
+    cosine = rowwise_cosine(left.text, right.text, left_idx, right_idx)
+    features[:, 7] = cosine
+    features[:, 8] = cosine
+    features[:, 9] = cosine
+    left_image, right_image = left.image_row[left_idx], right.image_row[right_idx]
+    both_images = (left_image >= 0) & (right_image >= 0)
+    if both_images.any():
+        features[both_images, 13] = rowwise_cosine(left.image, right.image, left_image[both_images], right_image[both_images])
+    return features
+
+def align_feature_matrix(features: np.ndarray, feature_names) -> np.ndarray:
+    """Reorders FEATURE_COLUMNS columns to a model's feature order; names the builder doesn't know are zero."""
+    feature_names = list(feature_names)
+    if tuple(feature_names) == FEATURE_COLUMNS:
+        return features
+    aligned = np.zeros((len(features), len(feature_names)), dtype=np.float32)
+    for k, name in enumerate(feature_names):
+        if name in FEATURE_COLUMNS:
+            aligned[:, k] = features[:, FEATURE_COLUMNS.index(name)]
+    return aligned
+
 def create_features_from_embeddings(
     q1_title, q1_question, q1_text_emb, q1_img_emb,
     q2_title, q2_question, q2_text_emb, q2_img_emb,
-    nlp_en=None, stemmer_id=None, stopword_remover_id=None
+    nlp_en=None, stemmer_id=None, stopword_remover_id=None,
+    q1_preprocessed=None, q2_preprocessed=None
 ):
-    t1_clean = multilingual_preprocess(q1_title, nlp_en, stemmer_id, stopword_remover_id)
-    q1_clean = multilingual_preprocess(q1_question, nlp_en, stemmer_id, stopword_remover_id)
-    t2_clean = multilingual_preprocess(q2_title, nlp_en, stemmer_id, stopword_remover_id)
-    q2_clean = multilingual_preprocess(q2_question, nlp_en, stemmer_id, stopword_remover_id)
-    
-    features = {}
-    
-    features['len_char_q1'] = len(q1_question)
-    features['len_char_q2'] = len(q2_question)
-    features['len_word_q1'] = len(q1_question.split())
-    features['len_word_q2'] = len(q2_question.split())
-    features['len_diff_word'] = abs(features['len_word_q1'] - features['len_word_q2']) / max(features['len_word_q1'], features['len_word_q2'], 1)
-    
-    try:
-        fuzz_scores = [fuzz.QRatio(t1_clean, t2_clean)/100.0, fuzz.QRatio(q1_clean, q2_clean)/100.0]
-        features['fuzz_avg'] = np.mean(fuzz_scores)
-        features['fuzz_max'] = np.max(fuzz_scores)
-
-        cosine_sim = 0.0
-        if q1_text_emb is not None and q2_text_emb is not None:
-            norm1 = np.linalg.norm(q1_text_emb)
-            norm2 = np.linalg.norm(q2_text_emb)
-            if norm1 > 0 and norm2 > 0:
-                cosine_sim = np.dot(q1_text_emb, q2_text_emb) / (norm1 * norm2)
-        
-        features['cosine_max'] = cosine_sim
-        features['cosine_avg'] = cosine_sim
-        features['cosine_cross_max'] = cosine_sim
-        
-        t1_tokens, q1_tokens = t1_clean.split(), q1_clean.split()
-        t2_tokens, q2_tokens = t2_clean.split(), q2_clean.split()
-        features['jaccard_title'] = jaccard_similarity(t1_tokens, t2_tokens)
-        features['jaccard_question'] = jaccard_similarity(q1_tokens, q2_tokens)
-        features['jaccard_cross_avg'] = jaccard_similarity(set(t1_tokens + q1_tokens), set(t2_tokens + q2_tokens))
-
-        features['image_similarity'] = 0.0
-        if q1_img_emb is not None and q2_img_emb is not None:
-            norm1 = np.linalg.norm(q1_img_emb)
-            norm2 = np.linalg.norm(q2_img_emb)
-            if norm1 > 0 and norm2 > 0:
-                features['image_similarity'] = np.dot(q1_img_emb, q2_img_emb) / (norm1 * norm2)
-                
-    except Exception as e:
-        print(f"ERROR creating features from embeddings: {e}")
-        keys_to_zero = [
-            'fuzz_avg', 'fuzz_max', 'cosine_avg', 'cosine_max', 'cosine_cross_max', 
-            'jaccard_title', 'jaccard_question', 'jaccard_cross_avg', 'image_similarity'
-        ]
-        for key in keys_to_zero:
-            features[key] = 0.0     
-    return features
\ No newline at end of file
+    """Single-pair form of build_feature_matrix, returned as a {column: value} dict."""
+    # Callers pass (clean title, clean question) when they have it precomputed or stored.
+    q1_preprocessed = q1_preprocessed or preprocess_question(q1_title, q1_question, nlp_en, stemmer_id, stopword_remover_id)
+    q2_preprocessed = q2_preprocessed or preprocess_question(q2_title, q2_question, nlp_en, stemmer_id, stopword_remover_id)
+    left = PreparedQuestions([q1_question], [q1_preprocessed], [q1_text_emb], [q1_img_emb])
+    right = PreparedQuestions([q2_question], [q2_preprocessed], [q2_text_emb], [q2_img_emb])
+    return dict(zip(FEATURE_COLUMNS, build_feature_matrix(left, right)[0].tolist()))
@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from embedding_cache import EmbeddingCache
+
+
+def vec(value, dim=4):
+    return np.full(dim, value, dtype=np.float32)
+
+
+def test_normalized_text_shares_an_entry(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 'model', 4, capacity=8)
+    cache.put('What  is\n numpy? ', vec(1))
+    np.testing.assert_array_equal(cache.get('What is numpy?'), vec(1))
+    assert cache.get('what is numpy?') is None
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 'model', 4, capacity=2)
+    cache.put_many(['a', 'b'], [vec(1), vec(2)])
+    cache.get('a')
+    cache.put('c', vec(3))
+    results = cache.get_many(['a', 'b', 'c'])
+    np.testing.assert_array_equal(results[0], vec(1))
+    assert results[1] is None
+    np.testing.assert_array_equal(results[2], vec(3))
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['evictions'] == 1
+
+
+def test_entries_persist_and_are_shared_between_instances(tmp_path):
+    writer = EmbeddingCache(str(tmp_path), 'model', 4, capacity=8)
+    writer.put_many(['a', 'b'], [vec(1), vec(2)])
+    reader = EmbeddingCache(str(tmp_path), 'model', 4, capacity=8)
+    np.testing.assert_array_equal(reader.get('b'), vec(2))
+    reader.put('c', vec(3))
+    np.testing.assert_array_equal(writer.get('c'), vec(3))
+
+
+def test_reused_slot_is_never_returned_for_the_old_key(tmp_path):
+    first = EmbeddingCache(str(tmp_path), 'model', 4, capacity=1)
+    second = EmbeddingCache(str(tmp_path), 'model', 4, capacity=1)
+    first.put('a', vec(1))
+    second.put('b', vec(2))
+    assert first.get('a') is None
+    np.testing.assert_array_equal(first.get('b'), vec(2))
+
+
+def test_models_and_dimensions_do_not_mix(tmp_path):
+    EmbeddingCache(str(tmp_path), 'torch-model', 4, capacity=8).put('a', vec(1))
+    assert EmbeddingCache(str(tmp_path), 'onnx-model', 4, capacity=8).get('a') is None
+    assert EmbeddingCache(str(tmp_path), 'torch-model', 8, capacity=8).get('a') is None
+
+
+def test_wrong_shape_vectors_are_not_stored(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), 'model', 4, capacity=8)
+    cache.put('a', np.ones(3))
+    assert cache.get('a') is None
+
+
+def test_capacity_mismatch_leaves_the_shared_cache_alone(tmp_path):
+    EmbeddingCache(str(tmp_path), 'model', 4, capacity=8).put('a', vec(1))
+    with pytest.raises(ValueError):
+        EmbeddingCache(str(tmp_path), 'model', 4, capacity=16)
+    np.testing.assert_array_equal(EmbeddingCache(str(tmp_path), 'model', 4, capacity=8).get('a'), vec(1))
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from embedding_codec import EmbeddingFormatError, decode_embedding, encode_embedding, read_header
+
+
+@pytest.fixture
+def vector():
+    return np.random.default_rng(0).normal(size=384).astype(np.float32)
+
+
+def test_float32_round_trip_is_exact(vector):
+    decoded = decode_embedding(encode_embedding(vector, 'float32', 'text-model'))
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, vector)
+
+
+@pytest.mark.parametrize('dtype, tolerance', [('float16', 1e-3), ('int8', 2e-2)])
+def test_compact_round_trip_stays_close(vector, dtype, tolerance):
+    decoded = decode_embedding(encode_embedding(vector, dtype, 'text-model'))
+    assert decoded.shape == vector.shape
+    cosine = decoded @ vector / (np.linalg.norm(decoded) * np.linalg.norm(vector))
+    assert cosine > 1 - tolerance
+
+
+def test_header_records_dtype_dim_and_model(vector):
+    dtype, dim, model_id, _ = read_header(encode_embedding(vector, 'int8', 'resnet50'))
+    assert (dtype, dim, model_id) == ('int8', 384, 'resnet50')
+
+
+def test_legacy_float32_bytes_still_decode(vector):
+    np.testing.assert_array_equal(decode_embedding(vector.tobytes()), vector)
+
+
+def test_empty_blob_decodes_to_none():
+    assert decode_embedding(None) is None
+    assert decode_embedding(b'') is None
+
+
+def test_unknown_dtype_and_bad_legacy_size_are_rejected(vector):
+    with pytest.raises(EmbeddingFormatError):
+        encode_embedding(vector, 'bfloat16')
+    with pytest.raises(EmbeddingFormatError):
+        decode_embedding(b'\x00' * 7)
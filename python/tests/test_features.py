@@ -0,0 +1,111 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('fuzzywuzzy')
+pytest.importorskip('langdetect')
+
+from fuzzywuzzy import fuzz
+from shared_features import (FEATURE_COLUMNS, PreparedQuestions, build_feature_matrix,
+                             create_features_from_embeddings)
+
+WORDS = ['python', 'array', 'index', 'error', 'loop', 'list', 'dict', 'sort', 'string', 'file', 'read', 'null']
+
+
+def jaccard_similarity(list1, list2):
+    s1 = set(list1)
+    s2 = set(list2)
+    if not s1 and not s2: return 0.0
+    return len(s1.intersection(s2)) / len(s1.union(s2))
+
+
+def cosine(a, b):
+    if a is None or b is None:
+        return 0.0
+    norm1, norm2 = np.linalg.norm(a), np.linalg.norm(b)
+    if norm1 > 0 and norm2 > 0:
+        return np.dot(a, b) / (norm1 * norm2)
+    return 0.0
+
+
+def reference_features(q1_question, q1_clean, q1_text_emb, q1_img_emb, q2_question, q2_clean, q2_text_emb, q2_img_emb):
+    """The per-pair create_features_from_embeddings this module replaced, fed precomputed clean text."""
+    (t1_clean, q1_clean), (t2_clean, q2_clean) = q1_clean, q2_clean
+    features = {}
+    features['len_char_q1'] = len(q1_question)
+    features['len_char_q2'] = len(q2_question)
+    features['len_word_q1'] = len(q1_question.split())
+    features['len_word_q2'] = len(q2_question.split())
+    features['len_diff_word'] = abs(features['len_word_q1'] - features['len_word_q2']) / max(features['len_word_q1'], features['len_word_q2'], 1)
+    fuzz_scores = [fuzz.QRatio(t1_clean, t2_clean)/100.0, fuzz.QRatio(q1_clean, q2_clean)/100.0]
+    features['fuzz_avg'] = np.mean(fuzz_scores)
+    features['fuzz_max'] = np.max(fuzz_scores)
+    cosine_sim = cosine(q1_text_emb, q2_text_emb)
+    features['cosine_max'] = cosine_sim
+    features['cosine_avg'] = cosine_sim
+    features['cosine_cross_max'] = cosine_sim
+    t1_tokens, q1_tokens = t1_clean.split(), q1_clean.split()
+    t2_tokens, q2_tokens = t2_clean.split(), q2_clean.split()
+    features['jaccard_title'] = jaccard_similarity(t1_tokens, t2_tokens)
+    features['jaccard_question'] = jaccard_similarity(q1_tokens, q2_tokens)
+    features['jaccard_cross_avg'] = jaccard_similarity(set(t1_tokens + q1_tokens), set(t2_tokens + q2_tokens))
+    features['image_similarity'] = cosine(q1_img_emb, q2_img_emb)
+    return np.array([features[name] for name in FEATURE_COLUMNS], dtype=np.float64)
+
+
+def random_questions(rng, count, dim=8):
+    def sentence(low, high):
+        return ' '.join(rng.choice(WORDS, rng.integers(low, high)))
+    questions = [sentence(0, 20) for _ in range(count)]
+    preprocessed = [(sentence(0, 5), sentence(0, 12)) for _ in range(count)]
+    text_embs = rng.normal(size=(count, dim)).astype(np.float32)
+    text_embs[0] = 0
+    img_embs = [rng.normal(size=dim).astype(np.float32) if rng.random() < 0.6 else None for _ in range(count)]
+    img_embs[1] = np.zeros(dim, dtype=np.float32)
+    return questions, preprocessed, text_embs, img_embs
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    return rng, random_questions(rng, 40)
+
+
+def test_pair_matrix_matches_the_per_pair_features(corpus):
+    rng, (questions, preprocessed, text_embs, img_embs) = corpus
+    prepared = PreparedQuestions(questions, preprocessed, text_embs, img_embs)
+    left_idx = rng.integers(0, len(questions), 300)
+    right_idx = rng.integers(0, len(questions), 300)
+    features = build_feature_matrix(prepared, prepared, left_idx, right_idx)
+    assert features.shape == (300, len(FEATURE_COLUMNS))
+    for k, (i, j) in enumerate(zip(left_idx, right_idx)):
+        expected = reference_features(questions[i], preprocessed[i], text_embs[i], img_embs[i],
+                                      questions[j], preprocessed[j], text_embs[j], img_embs[j])
+        np.testing.assert_allclose(features[k], expected, rtol=1e-5, atol=1e-5)
+
+
+def test_single_query_mode_matches_the_per_pair_features(corpus):
+    _, (questions, preprocessed, text_embs, img_embs) = corpus
+    query = PreparedQuestions(questions[:1], preprocessed[:1], text_embs[2:3], img_embs[2:3])
+    prepared = PreparedQuestions(questions, preprocessed, text_embs, img_embs)
+    features = build_feature_matrix(query, prepared)
+    assert features.shape == (len(questions), len(FEATURE_COLUMNS))
+    for j in range(len(questions)):
+        expected = reference_features(questions[0], preprocessed[0], text_embs[2], img_embs[2],
+                                      questions[j], preprocessed[j], text_embs[j], img_embs[j])
+        np.testing.assert_allclose(features[j], expected, rtol=1e-5, atol=1e-5)
+
+
+def test_single_pair_wrapper_matches_the_matrix(corpus):
+    _, (questions, preprocessed, text_embs, img_embs) = corpus
+    features = create_features_from_embeddings(
+        'title', questions[3], text_embs[3], img_embs[3], 'title', questions[4], text_embs[4], img_embs[4],
+        q1_preprocessed=preprocessed[3], q2_preprocessed=preprocessed[4])
+    expected = reference_features(questions[3], preprocessed[3], text_embs[3], img_embs[3],
+                                  questions[4], preprocessed[4], text_embs[4], img_embs[4])
+    np.testing.assert_allclose([features[name] for name in FEATURE_COLUMNS], expected, rtol=1e-5, atol=1e-5)
+
+
+def test_no_pairs_gives_an_empty_matrix(corpus):
+    _, (questions, preprocessed, text_embs, img_embs) = corpus
+    prepared = PreparedQuestions(questions, preprocessed, text_embs, img_embs)
+    assert build_feature_matrix(prepared, prepared, [], []).shape == (0, len(FEATURE_COLUMNS))
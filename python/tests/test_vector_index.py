@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+
+from vector_index import VectorIndex
+
+
+def unit(rows):
+    return rows / np.linalg.norm(rows, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def clustered():
+    # Points scattered around a few directions, like question embeddings around topics.
+    rng = np.random.default_rng(1)
+    centers = unit(rng.normal(size=(20, 32)))
+    vectors = unit(centers[rng.integers(0, 20, size=6000)] + 0.15 * rng.normal(size=(6000, 32))).astype(np.float32)
+    ids = [f"q{i}" for i in range(len(vectors))]
+    return ids, vectors, rng
+
+
+def exact_top(vectors, ids, query, k, allowed=None):
+    scores = vectors @ (query / np.linalg.norm(query))
+    order = [i for i in np.argsort(-scores) if allowed is None or ids[i] in allowed]
+    return [ids[i] for i in order[:k]]
+
+
+def test_exact_search_matches_brute_force(clustered):
+    ids, vectors, rng = clustered
+    index = VectorIndex(train_threshold=10 ** 9)
+    index.add(ids, vectors)
+    query = rng.normal(size=32)
+    results = index.search(query, 10)
+    assert [qid for qid, _ in results] == exact_top(vectors, ids, query, 10)
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_ivf_search_keeps_most_exact_neighbours(clustered):
+    ids, vectors, rng = clustered
+    index = VectorIndex(nprobe=8, exact_max=0, train_threshold=1000)
+    index.add(ids, vectors)
+    assert index.needs_training()
+    index.train()
+    assert index.centroids is not None
+    recalls = []
+    for query in vectors[rng.choice(len(vectors), 20, replace=False)]:
+        found = {qid for qid, _ in index.search(query, 10)}
+        recalls.append(len(found & set(exact_top(vectors, ids, query, 10))) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_tag_filter_only_returns_tagged_questions(clustered):
+    ids, vectors, rng = clustered
+    tags = {qid: ['even' if i % 2 == 0 else 'odd'] for i, qid in enumerate(ids)}
+    tags['q1'].append('both')
+    index = VectorIndex(train_threshold=10 ** 9)
+    index.add(ids, vectors, tags=tags)
+    query = rng.normal(size=32)
+    even = {qid for qid in ids if tags[qid][0] == 'even'}
+    assert [qid for qid, _ in index.search(query, 15, ['even'])] == exact_top(vectors, ids, query, 15, even)
+    assert {qid for qid, _ in index.search(query, 5, ['both'])} == {'q1'}
+    assert index.search(query, 5, ['missing']) == []
+
+
+def test_set_tags_replaces_membership(clustered):
+    ids, vectors, _ = clustered
+    index = VectorIndex(train_threshold=10 ** 9)
+    index.add(ids[:3], vectors[:3], tags={'q0': ['a'], 'q1': ['a'], 'q2': ['b']})
+    index.set_tags({'q1': ['b']})
+    assert {qid for qid, _ in index.search(vectors[0], 5, ['a'])} == {'q0'}
+    assert {qid for qid, _ in index.search(vectors[0], 5, ['b'])} == {'q1', 'q2'}
+
+
+def test_removed_questions_are_not_returned_and_can_come_back(clustered):
+    ids, vectors, _ = clustered
+    index = VectorIndex(train_threshold=10 ** 9)
+    index.add(ids[:100], vectors[:100], tags={qid: ['t'] for qid in ids[:100]})
+    index.remove(['q0'])
+    assert len(index) == 99
+    assert 'q0' not in {qid for qid, _ in index.search(vectors[0], 100)}
+    assert 'q0' not in {qid for qid, _ in index.search(vectors[0], 100, ['t'])}
+    index.add(['q0'], vectors[:1], tags={'q0': ['t']})
+    assert index.search(vectors[0], 1, ['t'])[0][0] == 'q0'
+
+
+def test_re_adding_a_question_replaces_its_vector(clustered):
+    ids, vectors, _ = clustered
+    index = VectorIndex(train_threshold=10 ** 9)
+    index.add(ids[:2], vectors[:2])
+    index.add(['q0'], vectors[1:2])
+    assert len(index) == 2
+    assert index.search(vectors[1], 2)[1][1] == pytest.approx(1.0, abs=1e-5)
@@ -0,0 +1,175 @@
+import threading
+import numpy as np
+
+
+class VectorIndex:
+    """
+    In-memory cosine-similarity index over question text embeddings, with per-tag filtering.
+
+    Rows are unit vectors in one growable float32 matrix. Once the index holds `train_threshold`
+    vectors it is partitioned IVF-style: spherical k-means centroids split it into `nlist` lists and a
+    query only scores the rows of its `nprobe` closest lists. A tag-filtered query whose candidate set
+    is at most `exact_max` rows skips the partitioning and is scored exactly with one matrix product.
+    """
+
+    def __init__(self, dim=None, nlist=None, nprobe=8, exact_max=20000, train_threshold=4096):
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.exact_max = exact_max
+        self.train_threshold = train_threshold
+        self.ids = []
+        self.id_to_row = {}
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.live = np.zeros(0, dtype=bool)
+        self.row_tags = []
+        self.tag_rows = {}
+        self.centroids = None
+        self.assignments = np.zeros(0, dtype=np.int32)
+        self.trained_size = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.id_to_row)
+
+    @staticmethod
+    def _normalize(vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _grow(self, needed):
+        capacity = self.vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        vectors = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        vectors[:capacity] = self.vectors
+        live = np.zeros(new_capacity, dtype=bool)
+        live[:capacity] = self.live
+        assignments = np.full(new_capacity, -1, dtype=np.int32)
+        assignments[:capacity] = self.assignments
+        self.vectors, self.live, self.assignments = vectors, live, assignments
+
+    def add(self, question_ids, vectors, tags=None):
+        """Inserts or replaces vectors; `tags` optionally maps question id -> iterable of tag ids."""
+        question_ids = list(question_ids)
+        if not question_ids:
+            return
+        vectors = self._normalize(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self.vectors = np.zeros((0, self.dim), dtype=np.float32)
+            rows = []
+            for qid in question_ids:
+                row = self.id_to_row.get(qid)
+                if row is None:
+                    row = len(self.ids)
+                    self.ids.append(qid)
+                    self.row_tags.append(frozenset())
+                    self.id_to_row[qid] = row
+                rows.append(row)
+            self._grow(len(self.ids))
+            rows = np.array(rows, dtype=np.int64)
+            self.vectors[rows] = vectors
+            self.live[rows] = True
+            if self.centroids is not None:
+                self.assignments[rows] = np.argmax(vectors @ self.centroids.T, axis=1)
+            if tags:
+                for qid in question_ids:
+                    if qid in tags:
+                        self._set_tags(self.id_to_row[qid], tags[qid])
+
+    def set_tags(self, tags):
+        """Replaces the tag sets of already indexed questions (question id -> iterable of tag ids)."""
+        with self._lock:
+            for qid, tag_ids in tags.items():
+                row = self.id_to_row.get(qid)
+                if row is not None:
+                    self._set_tags(row, tag_ids)
+
+    def _set_tags(self, row, tag_ids):
+        tag_ids = frozenset(tag_ids)
+        for tid in self.row_tags[row] - tag_ids:
+            self.tag_rows[tid].discard(row)
+        for tid in tag_ids - self.row_tags[row]:
+            self.tag_rows.setdefault(tid, set()).add(row)
+        self.row_tags[row] = tag_ids
+
+    def remove(self, question_ids):
+        with self._lock:
+            for qid in question_ids:
+                row = self.id_to_row.pop(qid, None)
+                if row is None:
+                    continue
+                self._set_tags(row, ())
+                self.live[row] = False
+
+    def needs_training(self):
+        size = len(self)
+        return size >= self.train_threshold and (self.centroids is None or size >= 2 * self.trained_size)
+
+    def train(self, iterations=10, sample_size=100000, seed=0):
+        """Fits spherical k-means centroids on a sample of the live rows and reassigns every row to its list."""
+        with self._lock:
+            live_rows = np.flatnonzero(self.live[:len(self.ids)])
+            if len(live_rows) == 0:
+                return
+            rng = np.random.default_rng(seed)
+            sample_rows = live_rows if len(live_rows) <= sample_size else rng.choice(live_rows, sample_size, replace=False)
+            sample = self.vectors[sample_rows].copy()
+        nlist = self.nlist or int(np.clip(np.sqrt(len(live_rows)), 16, 1024))
+        nlist = min(nlist, len(sample))
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)]
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            empty = ~np.any(sums, axis=1)
+            # Re-seed lists that lost all their members instead of keeping dead centroids.
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = self._normalize(sums)
+
+        with self._lock:
+            count = len(self.ids)
+            assignments = np.full(self.vectors.shape[0], -1, dtype=np.int32)
+            for start in range(0, count, 65536):
+                block = self.vectors[start:min(start + 65536, count)]
+                assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+            self.centroids = centroids
+            self.assignments = assignments
+            self.trained_size = len(self)
+
+    def search(self, query, k, tag_ids=None):
+        """Returns up to k (question id, cosine similarity) pairs, best first."""
+        query = self._normalize(query)[0]
+        with self._lock:
+            count = len(self.ids)
+            if count == 0 or k <= 0:
+                return []
+            if tag_ids is not None:
+                rows = set()
+                for tid in tag_ids:
+                    rows.update(self.tag_rows.get(tid, ()))
+                candidates = np.fromiter(rows, dtype=np.int64, count=len(rows))
+            else:
+                candidates = np.flatnonzero(self.live[:count])
+
+            if self.centroids is not None and len(candidates) > self.exact_max:
+                probe = np.argsort(self.centroids @ query)[::-1][:self.nprobe]
+                probed = candidates[np.isin(self.assignments[candidates], probe)]
+                # A narrow probe can miss a small filtered set; score it exactly rather than return too little.
+                if len(probed) >= k:
+                    candidates = probed
+
+            if len(candidates) == 0:
+                return []
+            scores = self.vectors[candidates] @ query
+            if len(candidates) > k:
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[candidates[i]], float(scores[i])) for i in top]